@@ -0,0 +1,131 @@
+from typing import Callable, Optional, Union
+import asyncio
+import concurrent.futures
+import functools
+
+import computor
+from computor import evaluate, solve_line
+from cache import LRUCache
+from disk_cache import DiskCache
+from result import EquationResult
+
+WORKERS = 4
+EXECUTORS = ('thread', 'process')
+
+
+def _evaluate_in_worker(equation_src: str, options: dict) \
+        -> EquationResult:
+    # Runs in a process of the pool, next to the caches _init_worker made.
+    return evaluate(equation_src, computor._worker_cache,
+                    computor._worker_solver_cache,
+                    **dict(computor._worker_options, **options))
+
+
+def _solve_line_in_worker(equation_src: str, options: dict) -> dict:
+    return solve_line(equation_src, computor._worker_cache,
+                      computor._worker_solver_cache,
+                      **dict(computor._worker_options, **options))
+
+
+class AsyncComputor:
+
+    def __init__(self, executor: str = 'thread', workers: int = WORKERS,
+                 max_in_flight: Optional[int] = None,
+                 timeout: Optional[float] = None, cache_size: int = 0,
+                 solver_cache_size: int = 0,
+                 disk_cache: Optional[dict] = None, **options):
+        # Runs evaluate() off the event loop. At most max_in_flight jobs
+        # (default: workers) are submitted at once, the rest wait for a
+        # slot without taking any executor queue space. Threads share one
+        # pair of caches, every process has its own. disk_cache holds
+        # DiskCache arguments, as for evaluate_batch().
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor '{executor}'")
+        self.timeout = timeout
+        self._options = options
+        self._slots = asyncio.Semaphore(max_in_flight or workers)
+        self.cache: Optional[Union[LRUCache, DiskCache]] = None
+        self.solver_cache: Optional[LRUCache] = None
+        if executor == 'process':
+            self._executor: concurrent.futures.Executor = \
+                concurrent.futures.ProcessPoolExecutor(
+                    workers, initializer=computor._init_worker,
+                    initargs=(cache_size, solver_cache_size, options,
+                              disk_cache))
+            self._evaluate: Callable = _evaluate_in_worker
+            self._solve_line: Callable = _solve_line_in_worker
+        else:
+            self._executor = concurrent.futures.ThreadPoolExecutor(workers)
+            if disk_cache is not None:
+                self.cache = DiskCache(**disk_cache)
+            elif cache_size:
+                self.cache = LRUCache(cache_size)
+            self.solver_cache = \
+                LRUCache(solver_cache_size) if solver_cache_size else None
+            self._evaluate = functools.partial(self._local, evaluate)
+            self._solve_line = functools.partial(self._local, solve_line)
+
+    def _local(self, func: Callable, equation_src: str, options: dict):
+        return func(equation_src, self.cache, self.solver_cache,
+                    **dict(self._options, **options))
+
+    async def evaluate(self, equation_src: str,
+                       timeout: Optional[float] = None,
+                       **options) -> EquationResult:
+        # The same EquationResult as evaluate(), or the same Diagnostic
+        # raised. options override the ones given to the constructor.
+        return await self._run(self._evaluate, equation_src, options,
+                               timeout)
+
+    async def solve_line(self, equation_src: str,
+                         timeout: Optional[float] = None, **options) -> dict:
+        return await self._run(self._solve_line, equation_src, options,
+                               timeout)
+
+    async def _run(self, func: Callable, equation_src: str, options: dict,
+                   timeout: Optional[float]):
+        loop = asyncio.get_running_loop()
+        await self._slots.acquire()
+        try:
+            job = self._executor.submit(func, equation_src, options)
+        except BaseException:
+            self._slots.release()
+            raise
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(job),
+                                          self.timeout if timeout is None
+                                          else timeout)
+        finally:
+            if job.done():
+                self._slots.release()
+            else:
+                # A job that has started cannot be stopped. On timeout or
+                # cancellation the caller stops waiting, but the slot is
+                # only given back once the job is over.
+                job.add_done_callback(lambda _: self._release(loop))
+
+    def _release(self, loop: asyncio.AbstractEventLoop) -> None:
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(self._slots.release)
+
+    def close(self, wait: bool = True) -> None:
+        # Without wait, jobs already running finish in the background and
+        # a disk cache is left for them to close on exit.
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        if wait and isinstance(self.cache, DiskCache):
+            self.cache.close()
+
+    async def __aenter__(self) -> 'AsyncComputor':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+
+async def async_evaluate(equation_src: str, timeout: Optional[float] = None,
+                         **options) -> EquationResult:
+    # One-off call on the loop's default executor, with no limit of its
+    # own. Use AsyncComputor to bound the jobs in flight.
+    job = asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(evaluate, equation_src, **options))
+    return await asyncio.wait_for(job, timeout)
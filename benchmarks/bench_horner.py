@@ -0,0 +1,38 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from computor import evaluate  # noqa: E402
+from polynomial import np  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Evaluate a compiled equation on a grid.")
+    parser.add_argument('equation', nargs='?',
+                        default="(x - 1) ^ 5 = 3 x ^ 2 - 7")
+    parser.add_argument('--points', type=int, default=10 ** 7)
+    args = parser.parse_args()
+    if np is None:
+        sys.exit("bench_horner requires numpy")
+
+    result = evaluate(args.equation, max_degree=None)
+    grid = np.linspace(-10.0, 10.0, args.points)
+    for derivative in [False, True]:
+        func = result.simplified.compile(derivative)
+        start = time.perf_counter()
+        func(grid)
+        elapsed = time.perf_counter() - start
+        print(f"degree {result.degree}, derivative={derivative!s:>5}: "
+              f"{args.points} points in {elapsed:.3f}s "
+              f"({args.points / elapsed / 1e6:.1f} Mpoints/s)")
+    value = result.simplified.compile()
+    print("residuals of reported roots:",
+          " ".join(f"{abs(value(root)):.1e}" for root in result.roots))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from polynomial import _schoolbook, _karatsuba, _fft, np  # noqa: E402
+
+SIZES = [8, 16, 32, 48, 64, 96, 128, 192, 256, 512, 1024, 2048]
+
+
+def best_time(func, a, b) -> float:
+    number = max(1, 20000 // (len(a) * len(a) // 16 + 1))
+    return min(timeit.repeat(lambda: func(a, b), number=number,
+                             repeat=3)) / number
+
+
+def main():
+    methods = [("schoolbook", _schoolbook), ("karatsuba", _karatsuba)]
+    if np is not None:
+        methods.append(("fft", _fft))
+    print(f"{'size':>6} " + " ".join(f"{name:>12}" for name, _ in methods))
+    crossover = {}
+    for size in SIZES:
+        rnd = random.Random(size)
+        # Small integers, the only operands _fft() takes.
+        a = [float(rnd.randint(-9, 9)) for _ in range(size)]
+        b = [float(rnd.randint(-9, 9)) for _ in range(size)]
+        times = [best_time(func, a, b) for _, func in methods]
+        for (name, _), elapsed in zip(methods[1:], times[1:]):
+            if elapsed < times[0]:
+                crossover.setdefault(name, size)
+            else:
+                crossover.pop(name, None)
+        print(f"{size:>6} " + " ".join(f"{t * 1e3:10.3f}ms" for t in times))
+    for name, _ in methods[1:]:
+        print(f"{name} beats schoolbook from "
+              f"{crossover.get(name, 'no measured')} coefficients")
+
+
+if __name__ == '__main__':
+    main()
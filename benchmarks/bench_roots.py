@@ -0,0 +1,56 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from roots import find_roots, np  # noqa: E402
+
+# Seconds per polynomial with random coefficients in [-1, 1].
+TARGETS = {
+    'numpy': {10: 0.001, 100: 0.05, 1000: 3.0},
+    'aberth': {10: 0.005, 100: 0.1, 1000: 10.0},
+}
+
+
+def residual(coefs, roots) -> float:
+    worst = 0.0
+    for root in roots:
+        value = 0j
+        scale = 0.0
+        for coef in reversed(coefs):
+            value = value * root + coef
+            scale = scale * abs(root) + abs(coef)
+        worst = max(worst, abs(value) / scale)
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time find_roots() against the per-degree targets.")
+    parser.add_argument('--degrees', type=int, nargs='+',
+                        default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    backends = ['aberth'] + (['numpy'] if np is not None else [])
+    failed = False
+    for backend in backends:
+        for degree in args.degrees:
+            rnd = random.Random(degree)
+            coefs = [rnd.uniform(-1, 1) for _ in range(degree + 1)]
+            start = time.perf_counter()
+            roots = find_roots(coefs, backend)
+            elapsed = time.perf_counter() - start
+            target = TARGETS[backend].get(degree)
+            status = "" if target is None else \
+                ("ok" if elapsed <= target else f"SLOW (target {target}s)")
+            failed |= status.startswith("SLOW")
+            print(f"{backend:>7} degree {degree:>5}: {elapsed:9.4f}s "
+                  f"residual {residual(coefs, roots):.1e} {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import math
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from numeric import newton_sqrt, quadratic_roots  # noqa: E402
+
+LEGACY_CAP = 5000
+
+
+def legacy_sqrt(val: float):
+    # The solver's original kernel: Newton from x = 1 with an absolute
+    # tolerance. Capped because large inputs can cycle between two floats.
+    x = 1
+    for iteration in range(1, LEGACY_CAP + 1):
+        nx = (x + val / x) / 2
+        if abs(x - nx) < 1e-10:
+            return x, iteration
+        x = nx
+    return x, LEGACY_CAP
+
+
+def legacy_roots(a: float, b: float, c: float):
+    root = legacy_sqrt(b * b - 4 * a * c)[0]
+    return (-b - root) / (2 * a), (-b + root) / (2 * a)
+
+
+def relative_error(value: float, exact: float) -> float:
+    return abs(value - exact) / exact if exact else abs(value)
+
+
+def main():
+    print(f"{'D':>8} | {'legacy it':>9} {'rel err':>8} | "
+          f"{'new it':>6} {'rel err':>8}")
+    for exponent in range(-300, 301, 50):
+        val = 3.0 * 10.0 ** exponent
+        exact = math.sqrt(val)
+        old, old_it = legacy_sqrt(val)
+        new, new_it = newton_sqrt(val)
+        capped = ">" if old_it == LEGACY_CAP else " "
+        print(f"{val:8.0e} | {capped}{old_it:>8} "
+              f"{relative_error(old, exact):8.1e} | {new_it:>6} "
+              f"{relative_error(new, exact):8.1e}")
+
+    values = [3.0 * 10.0 ** exponent for exponent in range(-12, 13, 3)]
+    for name, func in [("legacy", legacy_sqrt), ("new", newton_sqrt)]:
+        best = min(timeit.repeat(lambda: [func(val) for val in values],
+                                 number=200, repeat=5))
+        print(f"{name:>6}: {200 * len(values) / best:12.0f} sqrt/s "
+              f"over D in [3e-12, 3e12]")
+
+    # b^2 >> 4ac: the small root cancels in the textbook formula.
+    a, b, c = 1.0, 1e8, 1.0
+    print(f"x^2 + 1e8 x + 1: textbook small root {legacy_roots(a, b, c)[1]!r},"
+          f" stable {quadratic_roots(a, b, c)[2].real!r}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from computor import evaluate_system  # noqa: E402
+from linear_system import BACKENDS, np  # noqa: E402
+
+
+def grid_system(side: int, seed: int = 0) -> list:
+    # The 5-point Laplace stencil on a side x side grid: every equation
+    # touches at most five unknowns. Equations are shuffled so the
+    # elimination order does not come for free.
+    rnd = random.Random(seed)
+    equations = []
+    for row in range(side):
+        for col in range(side):
+            terms = [f"4 u{row}_{col}"]
+            for r, c in ((row - 1, col), (row + 1, col), (row, col - 1),
+                         (row, col + 1)):
+                if 0 <= r < side and 0 <= c < side:
+                    terms.append(f"- u{r}_{c}")
+            equations.append(f"{' '.join(terms)} = {rnd.randint(-9, 9)}")
+    rnd.shuffle(equations)
+    return equations
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Solve sparse linear systems with every backend.")
+    parser.add_argument('--sides', type=int, nargs='+',
+                        default=[10, 20, 40, 70])
+    parser.add_argument('--backends', nargs='+', choices=sorted(BACKENDS),
+                        default=sorted(BACKENDS))
+    parser.add_argument('--max-dense', type=int, default=3000,
+                        help="Skip the dense backend above this many "
+                             "unknowns.")
+    args = parser.parse_args()
+
+    for side in args.sides:
+        equations = grid_system(side)
+        for backend in args.backends:
+            if backend == 'dense' and (np is None or
+                                       len(equations) > args.max_dense):
+                continue
+            start = time.perf_counter()
+            result = evaluate_system(equations, backend)
+            elapsed = time.perf_counter() - start
+            print(f"{len(equations):>6} unknowns {backend:>6} "
+                  f"({result.method:>5}): {elapsed * 1e3:10.1f}ms "
+                  f"residual {result.residual:.1e}")
+
+
+if __name__ == '__main__':
+    main()
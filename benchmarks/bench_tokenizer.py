@@ -0,0 +1,76 @@
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from computor import create_tokens  # noqa: E402
+from parse_token import Token, TOKEN_NUM, TOKEN_VAR  # noqa: E402
+
+EQUATION = "5 * X^0 + 4 * X^1 - 9.3 * X^2 = 1 * X^0 + (3.25x - 7) * 12.5 " * 20
+
+
+def legacy_create_tokens(equation: str):
+    # Tokenizer as it was before kinds were introduced: the pattern is
+    # compiled on every call and tokens carry text only.
+    pattern = re.compile(r"("
+                         r"(?:[-+()])"
+                         r"|(?:[\d.]+)"
+                         r"|(?:[*/])"
+                         r"|(?:[xX])"
+                         r"|(?:\^)"
+                         r"|(?:\s+)"
+                         r"|(?:=)"
+                         r")"
+                         )
+    position = 0
+    while position < len(equation):
+        match_obj = pattern.match(equation, position)
+        text = match_obj.group(1)
+        yield Token(text, match_obj.start(1), 'legacy')
+        position = match_obj.end()
+
+
+def legacy_isdigit(text: str) -> bool:
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+def legacy_pass(equation: str) -> int:
+    # select_action, previous-is-digit, _validate_rpn, _add_token and the
+    # float() in traversal each re-parsed the token text.
+    count = 0
+    for token in legacy_create_tokens(equation):
+        for _ in range(4):
+            if legacy_isdigit(token.text) or token.text in ['x', 'X']:
+                count += 1
+        if legacy_isdigit(token.text):
+            float(token.text)
+    return count
+
+
+def current_pass(equation: str) -> int:
+    count = 0
+    for token in create_tokens(equation):
+        for _ in range(4):
+            if token.kind in [TOKEN_NUM, TOKEN_VAR]:
+                count += 1
+        if token.kind == TOKEN_NUM:
+            token.value
+    return count
+
+
+def main(repeat: int = 200):
+    tokens = sum(1 for _ in create_tokens(EQUATION))
+    for name, func in [("before", legacy_pass), ("after", current_pass)]:
+        best = min(timeit.repeat(lambda: func(EQUATION), number=repeat,
+                                 repeat=5))
+        print(f"{name:>6}: {best / repeat / tokens * 1e9:8.1f} ns/token")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import Client, SolverServer, parse_address  # noqa: E402
+
+
+def random_equation(rnd: random.Random) -> str:
+    return f"{rnd.randint(1, 9)} * x^2 + {rnd.randint(-50, 50)} * x " \
+           f"= {rnd.randint(-50, 50)}"
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def connection(address, equations, depth: int, latencies: list,
+                     errors: list) -> None:
+    async with await Client.connect(address) as client:
+        window = asyncio.Semaphore(depth)
+
+        async def one(equation_src: str) -> None:
+            async with window:
+                start = time.perf_counter()
+                record = await client.solve(equation_src)
+                latencies.append(time.perf_counter() - start)
+                if "error" in record:
+                    errors.append(record)
+
+        await asyncio.gather(*(one(equation) for equation in equations))
+
+
+async def run(args) -> None:
+    server = None
+    address = parse_address(args.address) if args.address else None
+    if address is None:
+        address = os.path.join(tempfile.mkdtemp(), "computor.sock")
+        server = SolverServer(args.concurrency,
+                              cache_size=args.cache_size)
+        await server.start(address)
+
+    rnd = random.Random(args.seed)
+    pool = [random_equation(rnd) for _ in range(args.distinct)]
+    per_connection = args.requests // args.connections
+    latencies: list = []
+    errors: list = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        connection(address, [rnd.choice(pool) for _ in range(per_connection)],
+                   args.depth, latencies, errors)
+        for _ in range(args.connections)))
+    elapsed = time.perf_counter() - start
+    if server is not None:
+        server.close()
+
+    latencies.sort()
+    print(f"{len(latencies)} requests over {args.connections} connections, "
+          f"pipeline depth {args.depth}")
+    print(f"  throughput {len(latencies) / elapsed:10.0f} req/s")
+    print(f"  p50        {percentile(latencies, 0.50) * 1e3:10.3f} ms")
+    print(f"  p99        {percentile(latencies, 0.99) * 1e3:10.3f} ms")
+    print(f"  errors     {len(errors):10d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load-test a computor --serve instance. Without "
+                    "--address an in-process server on a temporary Unix "
+                    "socket is used.")
+    parser.add_argument('--address', type=str,
+                        help="Unix socket path or [host:]port")
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--connections', type=int, default=8)
+    parser.add_argument('--depth', type=int, default=32,
+                        help="Requests in flight per connection.")
+    parser.add_argument('--distinct', type=int, default=1000,
+                        help="Size of the equation pool requests draw from.")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--cache-size', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from computor import create_tokens  # noqa: E402
+from rpn import ShuntingYard  # noqa: E402
+from expression_tree import ExpressionTree  # noqa: E402
+
+
+def long_sum(terms: int) -> str:
+    return "+".join(f"{i % 7}x^{i % 3}" for i in range(terms)) + "=1"
+
+
+def nested_sum(terms: int) -> str:
+    return "(x+" * terms + "1" + ")" * terms + "=0"
+
+
+def nested_brackets(depth: int) -> str:
+    return "(" * depth + "x" + ")" * depth + "=2"
+
+
+SHAPES = {
+    'sum': (long_sum, 6),
+    'nested_sum': (nested_sum, 4),
+    'brackets': (nested_brackets, 2),
+}
+
+
+def run(equation: str):
+    tokens = create_tokens(equation)
+    rpn = ShuntingYard(tokens).convert()
+    tree = ExpressionTree(rpn)
+    tree.create()
+    return tree.evaluate()
+
+
+def measure(equation: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    run(equation)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Stress the parser with 10^5 - 10^6 token equations and "
+                    "check that time and memory per token stay flat.")
+    parser.add_argument('--max-tokens', type=int, default=10 ** 6)
+    parser.add_argument('--tolerance', type=float, default=3.0,
+                        help="Allowed growth of the per-token cost between "
+                             "the smallest and the largest input.")
+    args = parser.parse_args()
+
+    sizes = []
+    size = 10 ** 5
+    while size <= args.max_tokens:
+        sizes.append(size)
+        size *= 4
+    failed = False
+    for name, (build, tokens_per_unit) in SHAPES.items():
+        per_token = []
+        for size in sizes:
+            elapsed, peak = measure(build(size // tokens_per_unit))
+            per_token.append((elapsed / size, peak / size))
+            print(f"{name:>10} {size:>8} tokens: {elapsed:7.3f}s "
+                  f"{elapsed / size * 1e6:6.2f}us/token "
+                  f"{peak / size:7.1f}B/token peak")
+        time_growth = per_token[-1][0] / per_token[0][0]
+        mem_growth = per_token[-1][1] / per_token[0][1]
+        if time_growth > args.tolerance or mem_growth > args.tolerance:
+            print(f"{name:>10}: not linear (time x{time_growth:.2f}, "
+                  f"memory x{mem_growth:.2f})")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from computor import create_tokens, evaluate  # noqa: E402
+from parse_token import TOKEN_SPACE  # noqa: E402
+from rpn import ShuntingYard  # noqa: E402
+from expression_tree import ExpressionTree, PolynomialBuilder  # noqa: E402
+from solve import Checker, SolveEquation  # noqa: E402
+
+SIZES = [10, 100, 1000, 10 ** 4, 10 ** 5, 10 ** 6]
+# name: (maximum bracket depth, share of terms repeated from a small pool)
+SHAPES = {
+    'flat': (0, 0.0),
+    'nested': (32, 0.0),
+    'duplicates': (0, 0.9),
+}
+STAGES = ['tokenize', 'rpn', 'tree_create', 'tree_evaluate', 'fused',
+          'check', 'solve', 'end_to_end']
+MIN_TIME = 0.2
+MAX_REPEAT = 50
+# Committed reference timings, made on x86_64 with CPython 3.11 by
+#   python benchmarks/suite.py -o benchmarks/baseline.json
+# Regenerate it on the machine that runs the comparison, and after any
+# intended change in speed.
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'baseline.json')
+
+
+def term(rnd: random.Random) -> str:
+    return f"{rnd.randint(1, 99)} * x^{rnd.randint(0, 2)}"
+
+
+def generate(tokens: int, nesting: int = 0, duplicates: float = 0.0,
+             seed: int = 0) -> str:
+    # About `tokens` non-space tokens of a degree <= 2 equation. Brackets
+    # open and close at random up to `nesting` deep, `duplicates` is the
+    # share of terms drawn from a pool of eight, the rest are fresh.
+    rnd = random.Random(seed)
+    pool = [term(rnd) for _ in range(8)]
+    parts = []
+    count = 2
+    depth = 0
+    while count < tokens:
+        if parts:
+            parts.append(rnd.choice([" + ", " - "]))
+            count += 1
+        while depth < nesting and rnd.random() < 0.3:
+            parts.append("(")
+            depth += 1
+            count += 2
+        parts.append(rnd.choice(pool) if rnd.random() < duplicates
+                     else term(rnd))
+        count += 5
+        while depth and rnd.random() < 0.3:
+            parts.append(")")
+            depth -= 1
+    parts.append(")" * depth)
+    parts.append(f" = {rnd.randint(1, 99)}")
+    return "".join(parts)
+
+
+def best_time(func, *args) -> float:
+    # Best of several runs, repeated until MIN_TIME has been spent.
+    best = float('inf')
+    spent = 0.0
+    for _ in range(MAX_REPEAT):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        if spent >= MIN_TIME:
+            break
+    return best
+
+
+def build_tree(rpn: list) -> ExpressionTree:
+    tree = ExpressionTree(rpn)
+    tree.create()
+    return tree
+
+
+def fused(equation: str):
+    builder = PolynomialBuilder()
+    ShuntingYard(create_tokens(equation), builder.push).run()
+    return builder.result()
+
+
+def run_case(equation: str, stages: list) -> dict:
+    # Every stage is timed on the output of the previous one. 'fused' does
+    # tokenize to tree_evaluate in the single pass evaluate() uses.
+    tokens = list(create_tokens(equation))
+    rpn = ShuntingYard(tokens).convert()
+    tree = build_tree(rpn)
+    poly = tree.evaluate()
+    work = {
+        'tokenize': lambda: list(create_tokens(equation)),
+        'rpn': lambda: ShuntingYard(tokens).convert(),
+        'tree_create': lambda: build_tree(rpn),
+        'tree_evaluate': tree.evaluate,
+        'fused': lambda: fused(equation),
+        'check': lambda: Checker(poly).check_all(),
+        'solve': lambda: SolveEquation(poly).solve(),
+        'end_to_end': lambda: evaluate(equation),
+    }
+    return {stage: best_time(work[stage]) for stage in stages}
+
+
+def run_suite(sizes: list, shapes: list, stages: list, seed: int = 0) \
+        -> list:
+    results = []
+    for shape in shapes:
+        nesting, duplicates = SHAPES[shape]
+        for size in sizes:
+            equation = generate(size, nesting, duplicates, seed)
+            tokens = sum(1 for tok in create_tokens(equation)
+                         if tok.kind != TOKEN_SPACE)
+            for stage, seconds in run_case(equation, stages).items():
+                results.append({"shape": shape, "size": size,
+                                "tokens": tokens, "stage": stage,
+                                "seconds": seconds,
+                                "ns_per_token": seconds / tokens * 1e9})
+                print(f"{shape:>10} {tokens:>8} {stage:>13}: "
+                      f"{seconds * 1e3:10.3f}ms "
+                      f"{seconds / tokens * 1e9:8.1f}ns/token",
+                      file=sys.stderr)
+    return results
+
+
+def regressions(results: list, baseline: list, threshold: float) -> list:
+    # Cases slower than the baseline by more than `threshold` (0.25 means
+    # 25%). Cases under a millisecond are too noisy to compare.
+    previous = {(rec["shape"], rec["size"], rec["stage"]): rec["seconds"]
+                for rec in baseline}
+    slower = []
+    for rec in results:
+        before = previous.get((rec["shape"], rec["size"], rec["stage"]))
+        if before is None or max(before, rec["seconds"]) < 1e-3:
+            continue
+        if rec["seconds"] > before * (1 + threshold):
+            slower.append(dict(rec, baseline=before,
+                               ratio=rec["seconds"] / before))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time every pipeline stage on synthetic equations of "
+                    "10 to 10^6 tokens.")
+    parser.add_argument('--max-tokens', type=int, default=10 ** 5,
+                        help="Largest size to run (up to 10^6).")
+    parser.add_argument('--shapes', nargs='+', choices=list(SHAPES),
+                        default=list(SHAPES))
+    parser.add_argument('--stages', nargs='+', choices=STAGES,
+                        default=STAGES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', type=str,
+                        help="Write the results as JSON to this file.")
+    parser.add_argument('--baseline', type=str, nargs='?', const=BASELINE,
+                        help="JSON written by an earlier run with -o "
+                             "(without PATH benchmarks/baseline.json). "
+                             "Exit with status 1 if a case got slower.")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed slowdown against --baseline.")
+    args = parser.parse_args()
+
+    sizes = [size for size in SIZES if size <= args.max_tokens]
+    results = run_suite(sizes, args.shapes, args.stages, args.seed)
+    report = {"python": platform.python_version(),
+              "machine": platform.machine(),
+              "seed": args.seed,
+              "results": results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            json.dump(report, out, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as source:
+            baseline = json.load(source)["results"]
+        slower = regressions(results, baseline, args.threshold)
+        for rec in slower:
+            print(f"REGRESSION {rec['shape']} {rec['size']} {rec['stage']}: "
+                  f"{rec['baseline'] * 1e3:.3f}ms -> "
+                  f"{rec['seconds'] * 1e3:.3f}ms (x{rec['ratio']:.2f})")
+        sys.exit(1 if slower else 0)
+
+
+if __name__ == '__main__':
+    main()
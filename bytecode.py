@@ -0,0 +1,158 @@
+from typing import Dict, Iterable, List, Optional
+from array import array
+import struct
+import sys
+
+from parse_token import Token, TOKEN_NUM, TOKEN_VAR, TOKEN_OP
+from polynomial import Polynomial
+from rpn import ShuntingYard
+from expression_tree import Operations, UnarySigns, DEGREE_CAP, finite, \
+    unary_op
+from errors import ValidateError, CODE_SYMBOL
+
+# An instruction is one uint32: the opcode in the low 4 bits and, for
+# OP_NUM, the index of the constant in the float64 pool above them.
+OP_NUM, OP_VAR, OP_NEG, OP_ADD, OP_SUB, OP_MUL, OP_DIV, OP_POW = range(8)
+OPCODE_BITS = 4
+OPCODE_MASK = (1 << OPCODE_BITS) - 1
+
+OPCODES = {'@': OP_NEG, '+': OP_ADD, '-': OP_SUB, '*': OP_MUL, '/': OP_DIV,
+           '^': OP_POW}
+OPCODE_TEXT = {opcode: text for text, opcode in OPCODES.items()}
+
+MAGIC = b'CPB1'
+HEADER = struct.Struct('<4sII')
+
+
+class Bytecode:
+
+    __slots__ = ['code', 'positions', 'pool']
+
+    def __init__(self, code: Optional[array] = None,
+                 positions: Optional[array] = None,
+                 pool: Optional[array] = None):
+        # positions[i] is the source column of code[i], for error messages.
+        self.code = array('I') if code is None else code
+        self.positions = array('I') if positions is None else positions
+        self.pool = array('d') if pool is None else pool
+
+    def run(self, degree_cap: Optional[int] = DEGREE_CAP) -> Polynomial:
+        operations = Operations(degree_cap)
+        pool = self.pool
+        var = Polynomial.monomial(1.0, 1)
+        stack: List[Polynomial] = []
+        push = stack.append
+        pop = stack.pop
+        try:
+            for index, word in enumerate(self.code):
+                opcode = word & OPCODE_MASK
+                if opcode == OP_NUM:
+                    push(Polynomial.constant(pool[word >> OPCODE_BITS]))
+                elif opcode == OP_VAR:
+                    push(var)
+                elif opcode == OP_NEG:
+                    stack[-1] = -stack[-1]
+                elif opcode == OP_ADD:
+                    right = pop()
+                    stack[-1] = stack[-1] + right
+                elif opcode == OP_SUB:
+                    right = pop()
+                    stack[-1] = stack[-1] - right
+                elif opcode == OP_MUL:
+                    right = pop()
+                    stack[-1] = stack[-1] * right
+                    if not stack[-1].is_finite():
+                        finite(Token('*', self.positions[index], TOKEN_OP),
+                               stack[-1])
+                else:
+                    # Division and power can fail, only they need a token
+                    # to point the error at.
+                    right = pop()
+                    op = Token(OPCODE_TEXT[opcode], self.positions[index],
+                               TOKEN_OP)
+                    stack[-1] = operations.evaluate(op, stack[-1], right)
+        except (IndexError, KeyError):
+            raise ValidateError("Уравнение не корректно!")
+        if len(stack) != 1:
+            raise ValidateError("Уравнение не корректно!")
+        return stack[0]
+
+    def to_bytes(self) -> bytes:
+        code, positions, pool = self.code, self.positions, self.pool
+        if sys.byteorder == 'big':
+            code, positions, pool = array('I', code), \
+                array('I', positions), array('d', pool)
+            for arr in (code, positions, pool):
+                arr.byteswap()
+        return HEADER.pack(MAGIC, len(code), len(pool)) + code.tobytes() + \
+            positions.tobytes() + pool.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Bytecode':
+        if len(data) < HEADER.size:
+            raise ValueError("not a compiled equation")
+        magic, size, pool_size = HEADER.unpack_from(data)
+        code, positions, pool = array('I'), array('I'), array('d')
+        if magic != MAGIC or len(data) != HEADER.size + \
+                size * 2 * code.itemsize + pool_size * pool.itemsize:
+            raise ValueError("not a compiled equation")
+        start = HEADER.size
+        for arr, count in ((code, size), (positions, size),
+                           (pool, pool_size)):
+            end = start + count * arr.itemsize
+            arr.frombytes(data[start:end])
+            start = end
+        if sys.byteorder == 'big':
+            for arr in (code, positions, pool):
+                arr.byteswap()
+        return cls(code, positions, pool)
+
+    def __eq__(self, other):
+        if not isinstance(other, Bytecode):
+            return NotImplemented
+        return self.code == other.code and self.pool == other.pool and \
+            self.positions == other.positions
+
+    def __len__(self):
+        return len(self.code)
+
+
+class Compiler:
+
+    def __init__(self):
+        # The emit target of ShuntingYard: appends one instruction per
+        # output token. Equal constants share a pool slot, unary plus
+        # is checked and dropped.
+        self.bytecode = Bytecode()
+        self._constants: Dict[float, int] = {}
+        self._signs = UnarySigns()
+
+    def push(self, token: Token) -> None:
+        code = self.bytecode.code
+        kind = token.kind
+        if kind == TOKEN_NUM:
+            pool = self.bytecode.pool
+            index = self._constants.setdefault(token.value, len(pool))
+            if index == len(pool):
+                pool.append(token.value)
+            code.append(index << OPCODE_BITS | OP_NUM)
+            self._signs.operand()
+        elif kind == TOKEN_VAR:
+            code.append(OP_VAR)
+            self._signs.operand()
+        elif kind == TOKEN_OP and token.text in unary_op:
+            if not self._signs.unary(token):
+                return
+            code.append(OP_NEG)
+        elif kind == TOKEN_OP and token.text in OPCODES:
+            code.append(OPCODES[token.text])
+            self._signs.binary()
+        else:
+            raise ValidateError("Undefined token", token, CODE_SYMBOL)
+        self.bytecode.positions.append(token.position)
+
+
+def compile_tokens(tokens: Iterable[Token]) -> Bytecode:
+    compiler = Compiler()
+    ShuntingYard(tokens, compiler.push).run()
+    return compiler.bytecode
@@ -1,13 +1,26 @@
 
-from typing import Generator
+from typing import Generator, Iterable, List, Optional, Pattern, \
+    TextIO, Tuple, Union
 import argparse
+import json
+import os
 import re
+import sys
 
-from parse_token import Token
+from parse_token import Token, TOKEN_NUM, TOKEN_SPACE, TOKEN_UNKNOWN
 from rpn import ShuntingYard
-from expression_tree import ExpressionTree
-from solve import SolveEquation
-from errors import ValidateError, ExpressionTreeError
+from expression_tree import ExpressionTree, PolynomialBuilder, DEGREE_CAP
+from solve import SolveEquation, MAX_DEGREE
+from errors import Diagnostic, ValidateError, ExpressionTreeError, \
+    CODE_SYMBOL, CODE_ARITHMETIC, CODE_INTERNAL
+from cache import LRUCache
+from disk_cache import DiskCache, MAXSIZE as DISK_CACHE_SIZE, default_path
+from result import EquationResult, SystemResult
+from render import format_answer, render, render_diagnostic, \
+    render_header, render_system, write
+from profiler import Profile
+from bytecode import Bytecode, compile_tokens
+from linear_system import BACKENDS, parse_linear, solve_system
 
 
 # 5 x ^ 0 = 5 x ^ 0
@@ -62,28 +75,35 @@ from errors import ValidateError, ExpressionTreeError
 # "6 * X ^ 0 + 11 * X ^ 1 + 5 * X ^ 2 = 1 * X ^ 0 + 1 * X ^ 1"
 # 5 * X ^ 0 + 3 * X ^ 1 + 3 * X ^ 2 = 1 * X ^0 + 0 * X ^5
 
-def create_tokens(equation: str) -> Generator:
-
-    pattern = re.compile(r"("
-                         r"(?:[-+()])"
-                         r"|(?:[\d.]+)"
-                         r"|(?:[*/])"
-                         r"|(?:[xX])"
-                         r"|(?:\^)"
-                         r"|(?:\s+)"
-                         r"|(?:=)"
-                         r")"
-                         )
-    position: int = 0
-    while position < len(equation):
-        match_obj = pattern.match(equation, position)
-        if match_obj is None:
-            raise ValidateError("Символ не опознан. Уравнение не валидно.",
-                                Token("", position))
+TOKEN_PATTERN = re.compile(r"(?P<op>[-+*/^])"
+                           r"|(?P<paren>[()])"
+                           r"|(?P<num>[\d.]+)"
+                           r"|(?P<var>[xX])"
+                           r"|(?P<space>\s+)"
+                           r"|(?P<eq>=)"
+                           r"|(?P<unknown>.)")
+# For systems: any identifier is an unknown, so 'xy' is one name and not
+# x * y.
+NAMED_TOKEN_PATTERN = re.compile(TOKEN_PATTERN.pattern.replace(
+    r"(?P<var>[xX])", r"(?P<var>[A-Za-z_]\w*)"))
+
 
-        text = match_obj.group(1)
-        yield Token(text, match_obj.start(1))
-        position = match_obj.end()
+def create_tokens(equation: str, pattern: Pattern = TOKEN_PATTERN) \
+        -> Generator:
+
+    for match_obj in pattern.finditer(equation):
+        kind = match_obj.lastgroup
+        text = match_obj.group()
+        value = None
+        if kind == TOKEN_NUM:
+            try:
+                value = float(text)
+            except ValueError:
+                kind = TOKEN_UNKNOWN
+        elif kind == TOKEN_UNKNOWN:
+            raise ValidateError("Символ не опознан. Уравнение не валидно.",
+                                Token("", match_obj.start()), CODE_SYMBOL)
+        yield Token(text, match_obj.start(), kind, value)
 
 
 def read_input() -> argparse.Namespace:
@@ -93,8 +113,85 @@ def read_input() -> argparse.Namespace:
                     "quotes. Don't forget a '=' symbol.\nNB! Equation should "
                     "not be like '--x=x'. If it starts with dash, add a space "
                     "in it.")
-    parser.add_argument('equation', type=str,
+    parser.add_argument('equation', type=str, nargs='?',
                         help='Input equation. Power in range from 0 to 2.')
+    parser.add_argument('-b', '--batch', metavar='FILE', type=str,
+                        help="Solve equations from FILE, one per line "
+                             "('-' for stdin). One JSON record per line "
+                             "is written to stdout.")
+    parser.add_argument('--serve', metavar='ADDRESS', type=str,
+                        help="Run as a service answering newline-delimited "
+                             "JSON requests on a Unix socket path or a "
+                             "[host:]port TCP address.")
+    parser.add_argument('--system', action='store_true',
+                        help="Solve a system of linear equations in named "
+                             "unknowns, separated by ';' in the argument "
+                             "or one per line on stdin without it.")
+    parser.add_argument('--system-backend', default='auto',
+                        choices=['auto'] + sorted(BACKENDS),
+                        help="dense - LU or least squares with numpy, "
+                             "sparse - for large systems with few unknowns "
+                             "per equation, gauss - pure Python "
+                             "elimination. auto picks by size and fill.")
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help="Equations solved at once by --serve.")
+    parser.add_argument('--executor', choices=['thread', 'process'],
+                        default='thread',
+                        help="Run --serve jobs in worker threads or "
+                             "worker processes.")
+    parser.add_argument('--timeout', metavar='SECONDS', type=float,
+                        help="Give up on an equation in --serve mode "
+                             "after this long.")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="Number of worker processes for --batch "
+                             "(0 - one per CPU core).")
+    parser.add_argument('--chunk-size', type=int, default=256,
+                        help="Equations sent to a worker at once in "
+                             "--batch mode.")
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help="Keep results of up to N distinct equations "
+                             "per --batch worker or --serve process "
+                             "(0 - no cache).")
+    parser.add_argument('--solver-cache-size', type=int, default=0,
+                        help="Memoize roots of up to N distinct simplified "
+                             "polynomials per --batch worker or --serve "
+                             "process.")
+    parser.add_argument('--cache-stats', action='store_true',
+                        help="Print cache hit rates to stderr after a run "
+                             "(for --batch only with --workers 1).")
+    parser.add_argument('--cache-file', metavar='PATH', type=str,
+                        nargs='?', const=default_path(),
+                        default=os.environ.get('COMPUTOR_CACHE'),
+                        help="Keep results in a SQLite file shared by all "
+                             "runs and processes (default $COMPUTOR_CACHE, "
+                             f"without PATH {default_path()}).")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Do not use --cache-file or $COMPUTOR_CACHE.")
+    parser.add_argument('--cache-max-entries', type=int,
+                        default=DISK_CACHE_SIZE,
+                        help="Least recently used results beyond this "
+                             "count are evicted from --cache-file.")
+    parser.add_argument('--cache-max-age', metavar='SECONDS', type=float,
+                        help="Results older than this are evicted from "
+                             "--cache-file.")
+    parser.add_argument('--diagnostics-only', action='store_true',
+                        help="In --batch mode write only the rejected "
+                             "lines, with error code, severity and "
+                             "position.")
+    parser.add_argument('--profile', action='store_true',
+                        help="Print time per stage, token and node counts "
+                             "and operation counts to stderr (for --batch "
+                             "only with --workers 1).")
+    parser.add_argument('--max-degree', type=int, default=MAX_DEGREE,
+                        help="Highest polynomial degree to solve, "
+                             "degrees above 2 are solved numerically. "
+                             "--degree-cap still limits how far powers "
+                             "are expanded and what is solved numerically "
+                             f"(default {MAX_DEGREE}, 0 - no limit).")
+    parser.add_argument('--degree-cap', type=int, default=DEGREE_CAP,
+                        help="Refuse to expand (a X + b) ^ n or to solve "
+                             "numerically beyond this degree (default "
+                             f"{DEGREE_CAP}).")
     group1 = parser.add_mutually_exclusive_group()
 
     group1.add_argument('-v', action='store_true',
@@ -104,53 +201,361 @@ def read_input() -> argparse.Namespace:
                         help="Activate quiet mode for program. "
                              "Forbidden with -v")
     args = parser.parse_args()
+    if args.equation is None and args.batch is None and \
+            args.serve is None and not args.system:
+        parser.error("equation, --batch, --serve or --system is required")
+    if args.batch is not None and args.workers != 1 and \
+            (args.cache_stats or args.profile):
+        parser.error("--cache-stats and --profile need --workers 1 in "
+                     "--batch mode")
+    if args.max_degree == 0:
+        args.max_degree = None
+    args.disk_cache = None
+    if args.cache_file and not args.no_cache:
+        args.disk_cache = {"path": args.cache_file,
+                           "maxsize": args.cache_max_entries,
+                           "max_age": args.cache_max_age}
     return args
 
 
-def evaluate(equation_src: str, verbose: bool = False, quiet: bool = False) \
-        -> str:
+_worker_cache: Optional[LRUCache] = None
+_worker_solver_cache: Optional[LRUCache] = None
+_worker_options: dict = {}
+
+
+def normalize_tokens(tokens: Iterable[Token]) -> Tuple[str, ...]:
+    return tuple(tok.text.lower() for tok in tokens
+                 if tok.kind != TOKEN_SPACE)
+
+
+def _evaluate_tokens(tokens: Iterable[Token],
+                     solver_cache: Optional[LRUCache] = None,
+                     max_degree: Optional[int] = MAX_DEGREE,
+                     degree_cap: Optional[int] = DEGREE_CAP,
+                     keep_rpn: bool = False) -> EquationResult:
+    # Tokens are parsed and folded into the polynomial in a single pass,
+    # neither the RPN list nor the tree is built.
+    builder = PolynomialBuilder(degree_cap, keep_rpn)
+    ShuntingYard(tokens, builder.push).run()
+    equation_simplified = builder.result()
+    solution = SolveEquation(equation_simplified, solver_cache,
+                             max_degree=max_degree,
+                             degree_cap=degree_cap).solve()
+    return EquationResult(tuple(builder.rpn or ()), equation_simplified,
+                          *solution)
 
+
+def _evaluate_profiled(equation_src: str, cache: Optional[LRUCache],
+                       solver_cache: Optional[LRUCache],
+                       max_degree: Optional[int], degree_cap: Optional[int],
+                       profile: Profile) -> EquationResult:
+    # The stages run one after another rather than fused, so that each
+    # can be timed on its own.
+    with profile.stage('tokenize'):
+        tokens = list(create_tokens(equation_src))
+    profile.count('tokens', sum(tok.kind != TOKEN_SPACE for tok in tokens))
+    key = None
+    if cache is not None:
+        key = (max_degree, degree_cap, True) + normalize_tokens(tokens)
+        result = cache.get(key)
+        if result is not None:
+            profile.count('cache_hits')
+            return result
+        profile.count('cache_misses')
+    with profile.stage('rpn'):
+        rpn = ShuntingYard(tokens).convert()
+    tree = ExpressionTree(rpn, degree_cap, profile.operations)
+    with profile.stage('tree'):
+        tree.create()
+    nodes, depth = tree.shape()
+    for node_type, count in nodes.items():
+        profile.count(f'nodes_{node_type}', count)
+    profile.depth(depth)
+    with profile.stage('simplify'):
+        equation_simplified = tree.evaluate()
+    profile.count('terms', len(equation_simplified.terms()))
+    with profile.stage('solve'):
+        solution = SolveEquation(equation_simplified, solver_cache,
+                                 max_degree=max_degree,
+                                 degree_cap=degree_cap).solve()
+    result = EquationResult(tuple(str(elem) for elem in rpn),
+                            equation_simplified, *solution)
+    if key is not None:
+        cache.put(key, result)
+    return result
+
+
+def evaluate(equation_src: str, cache: Optional[LRUCache] = None,
+             solver_cache: Optional[LRUCache] = None,
+             max_degree: Optional[int] = MAX_DEGREE,
+             degree_cap: Optional[int] = DEGREE_CAP,
+             profile: Optional[Profile] = None,
+             keep_rpn: bool = False) -> EquationResult:
+
+    if profile is not None:
+        # Kept apart so that evaluate() pays a single check when off.
+        try:
+            return _evaluate_profiled(equation_src, cache, solver_cache,
+                                      max_degree, degree_cap, profile)
+        finally:
+            profile.finish()
     tokens = create_tokens(equation_src)
-    rpn = ShuntingYard(tokens).convert()
-    tree = ExpressionTree(rpn)
-    tree.create()
-    equation_simplified = tree.evaluate()
-    if verbose:
-        print("Обратная польская нотация:", end="\n\t")
-        for elem in rpn:
-            print(elem, end=' ')
-        print("")
-    if not quiet:
-        print("Упрощенная форма:", end="\n\t")
-        size = len(equation_simplified)
-        for i, elem in enumerate(equation_simplified):
-            print(elem, end="")
-            if i + 1 < size:
-                print("+" if equation_simplified[i + 1].mult >= 0 else "",
-                      end="")
-        print(" = 0")
-    res = SolveEquation(equation_simplified, quiet).solve()
-    return res
+    if cache is None:
+        return _evaluate_tokens(tokens, solver_cache, max_degree, degree_cap,
+                                keep_rpn)
+    tokens = list(tokens)
+    key = (max_degree, degree_cap, keep_rpn) + normalize_tokens(tokens)
+    result = cache.get(key)
+    if result is None:
+        result = _evaluate_tokens(tokens, solver_cache, max_degree,
+                                  degree_cap, keep_rpn)
+        cache.put(key, result)
+    return result
 
 
-def computor():
-    data = read_input()
-    if not data.quiet:
-        print("\nComputor v1\n")
-        print("Исходное уравнение:", end="\n")
-        print(data.equation, end="")
+def compile_equation(equation_src: str) -> Bytecode:
+    return compile_tokens(create_tokens(equation_src))
 
-        if "=" in data.equation:
-            print("")
-        else:
-            print(" = 0")
+
+def evaluate_compiled(bytecode: Bytecode,
+                      solver_cache: Optional[LRUCache] = None,
+                      max_degree: Optional[int] = MAX_DEGREE,
+                      degree_cap: Optional[int] = DEGREE_CAP) \
+        -> EquationResult:
+    equation_simplified = bytecode.run(degree_cap)
+    solution = SolveEquation(equation_simplified, solver_cache,
+                             max_degree=max_degree,
+                             degree_cap=degree_cap).solve()
+    return EquationResult((), equation_simplified, *solution)
+
+
+def split_system(source: str) -> List[str]:
+    return [part.strip() for part in re.split(r"[;\n]", source)
+            if part.strip()]
+
+
+def evaluate_system(equations: Iterable[str], backend: str = 'auto') \
+        -> SystemResult:
+    # Every equation is reduced to a linear form in a single pass, the
+    # coefficient matrix is built from the forms.
+    forms = [parse_linear(create_tokens(equation_src, NAMED_TOKEN_PATTERN))
+             for equation_src in equations]
+    return solve_system(forms, backend)
+
+
+def result_record(result: EquationResult) -> dict:
+    return {"result": format_answer(result),
+            "simplified": str(result.simplified),
+            "degree": result.degree,
+            "discriminant": result.discriminant,
+            "roots": [[root.real, root.imag] for root in result.roots]}
+
+
+def solve_line(equation_src: str, cache: Optional[LRUCache] = None,
+               solver_cache: Optional[LRUCache] = None,
+               **options) -> dict:
+    record = {"equation": equation_src}
     try:
-        res = evaluate(data.equation, data.v, data.quiet)
-        print(res)
-    except ValidateError:
+        record.update(result_record(evaluate(equation_src, cache,
+                                             solver_cache, **options)))
+    except Diagnostic as exc:
+        record.update(diagnostic_record(exc))
+    except Exception as exc:
+        # Anything else fails this line only, the rest of a batch goes on.
+        record.update(diagnostic_record(unexpected_diagnostic(exc)))
+    return record
+
+
+def unexpected_diagnostic(exc: Exception) -> Diagnostic:
+    if isinstance(exc, (ArithmeticError, IndexError)):
+        return ExpressionTreeError(str(exc), code=CODE_ARITHMETIC)
+    return Diagnostic(f"Внутренняя ошибка: {type(exc).__name__}: {exc}",
+                      code=CODE_INTERNAL)
+
+
+def diagnostic_record(exc: Diagnostic) -> dict:
+    return {"error": exc.message, "diagnostic": exc.record()}
+
+
+def _open_caches(cache_size: int, solver_cache_size: int,
+                 disk_cache: Optional[dict] = None) -> Tuple:
+    if disk_cache is not None:
+        cache: Optional[Union[LRUCache, DiskCache]] = DiskCache(**disk_cache)
+    else:
+        cache = LRUCache(cache_size) if cache_size else None
+    solver_cache = LRUCache(solver_cache_size) if solver_cache_size else None
+    return cache, solver_cache
+
+
+def _init_worker(cache_size: int, solver_cache_size: int,
+                 options: dict, disk_cache: Optional[dict] = None) -> None:
+    # Only for pool processes: the caches of the process are module
+    # globals, as a pool task cannot carry them.
+    global _worker_cache, _worker_solver_cache, _worker_options
+    _worker_cache, _worker_solver_cache = \
+        _open_caches(cache_size, solver_cache_size, disk_cache)
+    _worker_options = options
+
+
+def _solve_numbered(item: Tuple[int, str],
+                    cache: Optional[Union[LRUCache, DiskCache]],
+                    solver_cache: Optional[LRUCache], options: dict) -> dict:
+    number, equation_src = item
+    record = {"line": number}
+    record.update(solve_line(equation_src, cache, solver_cache, **options))
+    return record
+
+
+def _solve_in_worker(item: Tuple[int, str]) -> dict:
+    return _solve_numbered(item, _worker_cache, _worker_solver_cache,
+                           _worker_options)
+
+
+def _cache_stats(cache: Optional[Union[LRUCache, DiskCache]],
+                 solver_cache: Optional[LRUCache]) -> dict:
+    return {name: cache.stats()
+            for name, cache in [("cache", cache),
+                                ("solver_cache", solver_cache)]
+            if cache is not None}
+
+
+def _numbered_lines(lines: Iterable[str]) -> Generator:
+    for number, line in enumerate(lines, 1):
+        equation_src = line.strip()
+        if equation_src:
+            yield number, equation_src
+
+
+def evaluate_batch(lines: Iterable[str], workers: int = 1,
+                   chunk_size: int = 256, cache_size: int = 0,
+                   solver_cache_size: int = 0,
+                   disk_cache: Optional[dict] = None,
+                   **options) -> Generator:
+    # disk_cache holds DiskCache arguments, every worker opens the file
+    # itself. It takes the place of the in-memory cache.
+    items = _numbered_lines(lines)
+    if workers == 1:
+        caches = _open_caches(cache_size, solver_cache_size, disk_cache)
+        try:
+            yield from _solve_serial(items, caches, options)
+        finally:
+            _close_caches(caches)
+        return
+    import multiprocessing
+    with multiprocessing.Pool(workers or os.cpu_count(), _init_worker,
+                              (cache_size, solver_cache_size, options,
+                               disk_cache)) as pool:
+        yield from pool.imap(_solve_in_worker, items, chunk_size)
+
+
+def _solve_serial(items: Iterable[Tuple[int, str]], caches: Tuple,
+                  options: dict) -> Generator:
+    for item in items:
+        yield _solve_numbered(item, *caches, options)
+
+
+def _close_caches(caches: Tuple) -> None:
+    for cache in caches:
+        if isinstance(cache, DiskCache):
+            cache.close()
+
+
+def collect_diagnostics(records: Iterable[dict]) -> Generator:
+    for record in records:
+        if "diagnostic" in record:
+            diagnostic = {"line": record["line"],
+                          "equation": record["equation"]}
+            diagnostic.update(record["diagnostic"])
+            yield diagnostic
+
+
+def run_batch(path: str, out: TextIO = sys.stdout, workers: int = 1,
+              chunk_size: int = 256, cache_size: int = 0,
+              solver_cache_size: int = 0, stats: bool = False,
+              diagnostics_only: bool = False, profile: bool = False,
+              disk_cache: Optional[dict] = None, **options) -> None:
+
+    if (stats or profile) and workers != 1:
+        raise ValueError("cache stats and profile need a single worker")
+    if profile:
+        options["profile"] = profile = Profile()
+    source = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    caches: Tuple = (None, None)
+    try:
+        if workers == 1:
+            # Opened here rather than by evaluate_batch() so that their
+            # stats can be read after the run.
+            caches = _open_caches(cache_size, solver_cache_size, disk_cache)
+            records = _solve_serial(_numbered_lines(source), caches, options)
+        else:
+            records = evaluate_batch(source, workers, chunk_size,
+                                     cache_size, solver_cache_size,
+                                     disk_cache, **options)
+        if diagnostics_only:
+            records = collect_diagnostics(records)
+        for record in records:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if stats:
+            print(json.dumps(_cache_stats(*caches)), file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        _close_caches(caches)
+    if isinstance(profile, Profile):
+        write(profile.format(), sys.stderr)
+
+
+def computor():
+    data = read_input()
+    if data.serve is not None:
+        from server import serve
+        serve(data.serve, concurrency=data.concurrency,
+              executor=data.executor, timeout=data.timeout,
+              cache_size=data.cache_size,
+              solver_cache_size=data.solver_cache_size,
+              max_degree=data.max_degree, degree_cap=data.degree_cap)
         return
-    except ExpressionTreeError:
+    if data.batch is not None:
+        run_batch(data.batch, workers=data.workers,
+                  chunk_size=data.chunk_size, cache_size=data.cache_size,
+                  solver_cache_size=data.solver_cache_size,
+                  stats=data.cache_stats,
+                  diagnostics_only=data.diagnostics_only,
+                  profile=data.profile, disk_cache=data.disk_cache,
+                  max_degree=data.max_degree,
+                  degree_cap=data.degree_cap)
         return
+    if data.system:
+        source = sys.stdin.read() if data.equation is None else data.equation
+        try:
+            result = evaluate_system(split_system(source),
+                                     data.system_backend)
+        except Diagnostic as exc:
+            write(render_diagnostic(exc))
+        except ImportError as exc:
+            write(f"{exc}\n", sys.stderr)
+        else:
+            write(render_system(result, data.quiet))
+        return
+    header = "" if data.quiet else render_header(data.equation)
+    profile = Profile() if data.profile else None
+    cache = None if data.disk_cache is None else DiskCache(**data.disk_cache)
+    try:
+        result = evaluate(data.equation, cache, max_degree=data.max_degree,
+                          degree_cap=data.degree_cap, profile=profile,
+                          keep_rpn=data.v)
+    except Diagnostic as exc:
+        write(header + render_diagnostic(exc))
+    except Exception as exc:
+        write(header + render_diagnostic(unexpected_diagnostic(exc)))
+    else:
+        write(header + render(result, data.v, data.quiet))
+    if profile is not None:
+        write(profile.format(), sys.stderr)
+    if cache is not None:
+        if data.cache_stats:
+            print(json.dumps(cache.stats()), file=sys.stderr)
+        cache.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,227 @@
+from typing import Any, Dict, Hashable, Optional
+import collections
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from polynomial import SparsePolynomial
+from result import EquationResult
+
+MAXSIZE = 100000
+# Size and age limits are enforced on open and every PRUNE_EVERY writes,
+# so the table may briefly hold that many rows over maxsize.
+PRUNE_EVERY = 64
+# Lookups only read. Their `used` times and counters are written with the
+# next put, or after FLUSH_EVERY lookups without one.
+FLUSH_EVERY = 256
+TIMEOUT = 10.0
+# Stored as PRAGMA user_version, results written in another format are
+# dropped on open.
+FORMAT_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def default_path() -> str:
+    base = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'computor', 'results.sqlite3')
+
+
+def encode_result(result: EquationResult) -> str:
+    # Terms rather than the coefficient list, so that X^1000000 - 1 takes
+    # two pairs.
+    return json.dumps([list(result.rpn), result.simplified.terms(),
+                       result.degree, result.discriminant,
+                       [[root.real, root.imag] for root in result.roots],
+                       result.factored])
+
+
+def decode_result(text: str) -> EquationResult:
+    rpn, terms, degree, discriminant, roots, factored = json.loads(text)
+    return EquationResult(tuple(rpn),
+                          SparsePolynomial.from_terms(dict(terms)), degree,
+                          discriminant,
+                          tuple(complex(re, im) for re, im in roots),
+                          factored)
+
+
+class DiskCache:
+
+    def __init__(self, path: str, maxsize: int = MAXSIZE,
+                 max_age: Optional[float] = None, timeout: float = TIMEOUT):
+        # A drop-in for LRUCache that keeps EquationResults in SQLite, so
+        # they survive between runs. Every process opens its own
+        # connection. WAL mode lets readers go on while one process writes,
+        # and writers wait up to `timeout` seconds for each other.
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.path = path
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        self._lookups = 0
+        self._used: Dict[str, float] = {}
+        self._expired: Dict[str, float] = {}
+        self._counts: collections.Counter = collections.Counter()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=timeout,
+                                   isolation_level=None,
+                                   check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._transaction() as db:
+            for statement in SCHEMA.split(';'):
+                db.execute(statement)
+            version = db.execute("PRAGMA user_version").fetchone()[0]
+            if version != FORMAT_VERSION:
+                db.execute("DELETE FROM results")
+                db.execute(f"PRAGMA user_version = {FORMAT_VERSION}")
+            self._prune(db, time.time())
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    @staticmethod
+    def _key_text(key: Hashable) -> str:
+        return json.dumps(key, ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def _count(db: sqlite3.Connection, name: str, value: int = 1) -> None:
+        db.execute("INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) "
+                   "DO UPDATE SET value = value + excluded.value",
+                   (name, value))
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        text = self._key_text(key)
+        now = time.time()
+        with self._lock:
+            # A plain read: in WAL mode it neither waits for writers nor
+            # holds them up.
+            row = self._db.execute("SELECT value, created FROM results "
+                                   "WHERE key = ?", (text,)).fetchone()
+            if row is not None and self.max_age is not None and \
+                    now - row[1] > self.max_age:
+                self._expired[text] = row[1]
+                row = None
+            if row is None:
+                self.misses += 1
+                self._counts['misses'] += 1
+            else:
+                self._used[text] = now
+                self.hits += 1
+                self._counts['hits'] += 1
+            self._lookups += 1
+            flush = self._lookups % FLUSH_EVERY == 0
+        if flush:
+            with self._transaction() as db:
+                self._flush(db)
+        return None if row is None else decode_result(row[0])
+
+    def put(self, key: Hashable, value: EquationResult) -> None:
+        now = time.time()
+        with self._transaction() as db:
+            self._flush(db)
+            db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                       (self._key_text(key), encode_result(value), now, now))
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._prune(db, now)
+
+    def _flush(self, db: sqlite3.Connection) -> None:
+        # Expired rows are only removed if no other process has written
+        # them again since they were read.
+        if self._used:
+            db.executemany("UPDATE results SET used = ? WHERE key = ?",
+                           [(used, text) for text, used in self._used.items()])
+        removed = sum(db.execute("DELETE FROM results WHERE key = ? AND "
+                                 "created = ?", item).rowcount
+                      for item in self._expired.items())
+        if removed:
+            self.evictions += removed
+            self._counts['evictions'] += removed
+        for name, value in self._counts.items():
+            self._count(db, name, value)
+        self._used.clear()
+        self._expired.clear()
+        self._counts.clear()
+
+    def _prune(self, db: sqlite3.Connection, now: float) -> None:
+        removed = 0
+        if self.max_age is not None:
+            removed += db.execute("DELETE FROM results WHERE created < ?",
+                                  (now - self.max_age,)).rowcount
+        size = db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if size > self.maxsize:
+            removed += db.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results "
+                "ORDER BY used LIMIT ?)", (size - self.maxsize,)).rowcount
+        if removed:
+            self.evictions += removed
+            self._count(db, 'evictions', removed)
+
+    def clear(self) -> None:
+        with self._transaction() as db:
+            db.execute("DELETE FROM results")
+            db.execute("DELETE FROM counters")
+            self._used.clear()
+            self._expired.clear()
+            self._counts.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def close(self) -> None:
+        if self._used or self._expired or self._counts:
+            with self._transaction() as db:
+                self._flush(db)
+        self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM results").fetchone()[0]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        # Counters of this process, plus the totals over every process
+        # that has used the file.
+        with self._transaction() as db:
+            self._flush(db)
+            totals = dict(db.execute("SELECT name, value FROM counters"))
+        return {"path": self.path, "size": len(self),
+                "maxsize": self.maxsize, "max_age": self.max_age,
+                "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": self.hit_rate,
+                "total": {name: totals.get(name, 0)
+                          for name in ['hits', 'misses', 'evictions']}}
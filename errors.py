@@ -1,30 +1,67 @@
 from typing import Optional
 
-from parse_token import Token
-from expression_tree_node import Node
+SEVERITY_ERROR = 'error'
+SEVERITY_INFO = 'info'
 
+CODE_SYMBOL = 'symbol'
+CODE_SYNTAX = 'syntax'
+CODE_ARITHMETIC = 'arithmetic'
+CODE_POWER = 'power'
+CODE_DEGREE = 'degree'
+CODE_DEGENERATE = 'degenerate'
+CODE_INTERNAL = 'internal'
 
-class ValidateError(Exception):
 
-    def __init__(self, message: str, token: Optional[Token] = None):
+class Diagnostic(Exception):
+    # Only the message code, position and text are stored. Nothing is
+    # printed or formatted until format() or record() is called, so a
+    # rejected equation costs no I/O.
+    code = CODE_SYNTAX
+
+    def __init__(self, message: str, source=None, code: Optional[str] = None,
+                 severity: str = SEVERITY_ERROR):
+        super().__init__(message)
         self._message = message
-        self._token = token
-        self.__repr__()
+        self.position: Optional[int] = getattr(source, 'position', None)
+        if code is not None:
+            self.code = code
+        self.severity = severity
 
-    def __repr__(self):
-        msg = ""
-        if isinstance(self._token, Token):
-            msg = " " * self._token.position + "^ "
-        print(msg + self._message)
+    def __reduce__(self):
+        return _restore, (type(self), self._message, self.position,
+                          self.code, self.severity)
 
+    @property
+    def message(self) -> str:
+        return self._message
 
-class ExpressionTreeError(Exception):
+    def format(self) -> str:
+        if self.position is None:
+            return self._message
+        return " " * self.position + "^ " + self._message
 
-    def __init__(self, message: str, node: Node):
-        self._message = message
-        self._node = node
-        self.__repr__()
+    def record(self) -> dict:
+        return {"code": self.code, "severity": self.severity,
+                "position": self.position, "message": self._message}
+
+    def __str__(self):
+        return self._message
 
     def __repr__(self):
-        msg = " " * self._node.position + "^ "
-        print(msg + self._message)
+        return f"{type(self).__name__}({self.code!r}, {self.position!r}, " \
+               f"{self._message!r})"
+
+
+def _restore(cls, message: str, position: Optional[int], code: str,
+             severity: str) -> Diagnostic:
+    exc = cls(message, code=code, severity=severity)
+    exc.position = position
+    return exc
+
+
+class ValidateError(Diagnostic):
+    code = CODE_SYNTAX
+
+
+class ExpressionTreeError(Diagnostic):
+    code = CODE_ARITHMETIC
@@ -1,16 +1,25 @@
-from typing import List, Union
+from typing import Counter, List, Optional, Tuple
+import collections
+import math
 
-from parse_token import Token
+from parse_token import Token, TOKEN_NUM, TOKEN_VAR, TOKEN_OP
 from expression_tree_node import Node
-from errors import ValidateError, ExpressionTreeError
+from polynomial import Polynomial, SparsePolynomial
+from errors import ValidateError, ExpressionTreeError, CODE_SYMBOL, \
+    CODE_SYNTAX, CODE_POWER
 
 NODE_NUM = 'num'
 NODE_VAR = 'var'
 NODE_OP = 'op'
 NODE_UNARY = 'unary'
 
+DEGREE_CAP = 10000
+REMAINDER_TOLERANCE = 1e-12
+
 operations = ['^', '*', '/', '+', '-']
 unary_op = ['@', '#']
+OPERATION_NAMES = {'*': 'multiplication', '/': 'division', '+': 'addition',
+                   '-': 'subtraction', '^': 'power'}
 
 
 class Stack:
@@ -50,7 +59,7 @@ class Stack:
             if left.token_type == NODE_UNARY and left.text != op.text:
                 raise ExpressionTreeError(
                         f"Различные унарные операторы",
-                        op)
+                        op, CODE_SYNTAX)
             op.aleft = left
             self.__return_to_stack(op)
         elif token_type == NODE_OP:
@@ -61,244 +70,259 @@ class Stack:
             op.aright = right
             self.__return_to_stack(op)
         else:
-            raise ExpressionTreeError("Неопознанный токен", self._stack[-1])
+            raise ExpressionTreeError("Неопознанный токен", self._stack[-1],
+                                      CODE_SYMBOL)
 
 
 class ExpressionTree:
 
-    def __init__(self, rpn: List[Token]):
+    def __init__(self, rpn: List[Token],
+                 degree_cap: Optional[int] = DEGREE_CAP,
+                 operation_counts: Optional[Counter] = None):
         self._rpn = rpn
         self._tree = None
         self._stack = Stack()
+        self._degree_cap = degree_cap
+        self._operation_counts = operation_counts
 
-    def evaluate(self):
-        tree = self.traversal(self._tree)
-        res = []
-        self._restore_infix(tree, res)
-        return res
-
-    def _restore_infix(self, tree: Node, res: List[Node]):
-        res.append(tree)
-        left = tree.aleft
-        right = tree.aright
-        tree.aleft = None
-        tree.aright = None
-        if left:
-            self._restore_infix(left, res)
-        if right:
-            self._restore_infix(right, res)
-
-    def traversal(self, node: Node):
-        left = 0
-        right = 0
-        if node.aleft:
-            left = self.traversal(node.aleft)
-        if node.aright:
-            right = self.traversal(node.aright)
-        if node.token_type == NODE_VAR:
-            return node
-        elif node.token_type == NODE_NUM:
-            node.mult = float(node.text)
-            node.power = 0
-            node.update_node('x', 'var')
-            return node
-        elif node.token_type == NODE_OP:
-            res = Operations().evaluate(node, left, right)
-            return res
-        elif node.token_type == NODE_UNARY:
-            res = self._evaluate_unary(node, left)
-            return res
-        return 0
-
-    @staticmethod
-    def _evaluate_unary(node: Node, left: Node) \
-            -> Node:
+    def evaluate(self) -> Polynomial:
+        return self.traversal(self._tree)
 
-        if left.token_type == NODE_VAR:
-            if node.text == '@':
-                left.mult = -left.mult
+    def traversal(self, node: Node) -> Polynomial:
+        if self._operation_counts is None:
+            operations = Operations(self._degree_cap)
         else:
-            if node.text == '@':
-                data = -1 * float(left.text)
+            operations = CountingOperations(self._degree_cap,
+                                            self._operation_counts)
+        values: List[Polynomial] = []
+        stack: List[Tuple[Node, bool]] = [(node, False)]
+        while stack:
+            node, visited = stack.pop()
+            if not visited:
+                stack.append((node, True))
+                if node.aright:
+                    stack.append((node.aright, False))
+                if node.aleft:
+                    stack.append((node.aleft, False))
+                continue
+            right = values.pop() if node.aright else None
+            left = values.pop() if node.aleft else None
+            if node.token_type == NODE_VAR:
+                values.append(Polynomial.monomial(1.0, 1))
+            elif node.token_type == NODE_NUM:
+                values.append(Polynomial.constant(node.value))
+            elif node.token_type == NODE_OP:
+                values.append(operations.evaluate(node, left, right))
+            elif node.token_type == NODE_UNARY:
+                values.append(self._evaluate_unary(node, left))
             else:
-                data = float(left.text)
-            left.update_node(data)
+                raise ExpressionTreeError("Неопознанный токен", node,
+                                          CODE_SYMBOL)
+        return values.pop()
+
+    @staticmethod
+    def _evaluate_unary(node: Node, left: Polynomial) \
+            -> Polynomial:
+        if node.text == '@':
+            return -left
         return left
 
+    def shape(self) -> Tuple[Counter, int]:
+        # Node count per node type and the depth of the tree.
+        counts: Counter = collections.Counter()
+        depth = 0
+        stack = [(self._tree, 1)] if self._tree is not None else []
+        while stack:
+            node, level = stack.pop()
+            counts[node.token_type] += 1
+            depth = max(depth, level)
+            for child in (node.aleft, node.aright):
+                if child is not None:
+                    stack.append((child, level + 1))
+        return counts, depth
+
     def create(self):
         for token in self._rpn:
             self._add_token(token)
         self._tree = self._stack.result()
 
     def _add_token(self, token: Token) -> None:
-        if token.text in operations:
-            token = Node(token, NODE_OP)
-        elif token.text in unary_op:
+        if token.kind == TOKEN_OP and token.text in unary_op:
             token = Node(token, NODE_UNARY)
-        elif token.text in ['x', 'X']:
+        elif token.kind == TOKEN_OP:
+            token = Node(token, NODE_OP)
+        elif token.kind == TOKEN_VAR:
             token = Node(token, NODE_VAR)
-        elif token.isdigit():
+        elif token.kind == TOKEN_NUM:
             token = Node(token, NODE_NUM)
         else:
-            raise ValidateError("Undefined token", token)
+            raise ValidateError("Undefined token", token, CODE_SYMBOL)
         self._stack.push(token)
 
 
-class Operations:
-
-    def evaluate(self, op: Node, left: Node, right: Node) -> Node:
-        if op.text == '*':
-            return self._multiplication(left, right)
-        elif op.text == '/':
-            return self._division(left, right)
-        elif op.text == '+':
-            return self._addition(left, right)
-        elif op.text == '-':
-            return self._subtraction(left, right)
-        elif op.text == '^':
-            return self._power(left, right)
-        else:
-            raise ExpressionTreeError(f"Что ты мне подсунул? Что это: "
-                                      f"'{op.text}'", op)
-
-    def _multiplication(self, left: Node, right: Node) -> Node:
-
-        if right.aleft and (left.power or left.aleft):
-            raise ExpressionTreeError(
-                "Сценарий вида (a1 * X + b1) * (a2 * X ^n + x ^ n-1) "
-                "ожидается в следующем проекте", right)
-        if right.power > left.power:
-            left, right = right, left
-
-        left.mult *= right.mult
-        left.power += right.power
-        tmp = left.aleft
-        while tmp:
-            tmp.mult *= right.mult
-            tmp.power += right.power
-            tmp = tmp.aleft
-        return left
-
-    def _division(self, left: Node, right: Node) -> Node:
-
-        if left.num_coef or right.num_coef or right.aleft:
-            raise ExpressionTreeError("Сценарий группы (a1 * X + b1) "
-                                      "/ (a2 * X + b2) запрещен",
-                                      right)
-
-        left.mult /= right.mult
-        left.power -= right.power
-        tmp = left.aleft
-        while tmp:
-            tmp.mult /= right.mult
-            tmp.power -= right.power
-            tmp = tmp.aleft
-        return left
-
-    def _subtraction(self, left: Node, right: Node, sign=True) -> Node:
-
-        if sign:
-            right.mult = -right.mult
-        if left.power < right.power:
-            left, right = right, left
+class UnarySigns:
 
-        if left.power != right.power:
-            left.num_coef -= right.num_coef
-            right.num_coef = 0
+    __slots__ = ['_unary']
 
-            if left.aleft and left.aleft.power >= right.power:
-                self._subtraction(left.aleft, right, sign=False)
-                return left
+    def __init__(self):
+        # Unary operator that produced each value on an RPN evaluation
+        # stack, if any. The builders keep the values, this the operators.
+        self._unary: List[Optional[str]] = []
+
+    def operand(self) -> None:
+        self._unary.append(None)
+
+    def binary(self) -> None:
+        self._unary.pop()
+        self._unary[-1] = None
+
+    def unary(self, token: Token) -> bool:
+        # True if the value on top is to be negated.
+        previous = self._unary[-1]
+        if previous is not None and previous != token.text:
+            raise ExpressionTreeError("Различные унарные операторы",
+                                      token, CODE_SYNTAX)
+        self._unary[-1] = token.text
+        return token.text == '@'
+
+
+class PolynomialBuilder:
+
+    def __init__(self, degree_cap: Optional[int] = DEGREE_CAP,
+                 keep_rpn: bool = False,
+                 operation_counts: Optional[Counter] = None):
+        # Evaluates RPN tokens as ShuntingYard emits them: a stack of
+        # partial polynomials replaces the tree, nothing else is kept.
+        if operation_counts is None:
+            self._operations = Operations(degree_cap)
+        else:
+            self._operations = CountingOperations(degree_cap,
+                                                  operation_counts)
+        self._values: List[Polynomial] = []
+        self._signs = UnarySigns()
+        self.rpn: Optional[List[str]] = [] if keep_rpn else None
+
+    def push(self, token: Token) -> None:
+        if self.rpn is not None:
+            self.rpn.append(token.text)
+        kind = token.kind
+        if kind == TOKEN_NUM:
+            self._values.append(Polynomial.constant(token.value))
+            self._signs.operand()
+        elif kind == TOKEN_VAR:
+            self._values.append(Polynomial.monomial(1.0, 1))
+            self._signs.operand()
+        elif kind == TOKEN_OP and token.text in unary_op:
+            if self._signs.unary(token):
+                self._values[-1] = -self._values[-1]
+        elif kind == TOKEN_OP:
+            right = self._values.pop()
+            self._signs.binary()
+            self._values[-1] = self._operations.evaluate(
+                token, self._values[-1], right)
+        else:
+            raise ValidateError("Undefined token", token, CODE_SYMBOL)
 
-            if left.aleft and left.aleft.power < right.power:
-                aleft = left.aleft
-                left.aleft = right
-                self._subtraction(right, aleft)
-                return left
+    def result(self) -> Polynomial:
+        return self._values[-1]
 
-            if not left.aleft:
-                left.aleft = right
-                return left
 
-            if right.aleft:
-                if left.aleft:
-                    self._subtraction(left.aleft, right.aleft)
-                else:
-                    left.aleft = right.aleft
-                    right.aleft = None
+def finite(op: Node, poly: Polynomial) -> Polynomial:
+    if not poly.is_finite():
+        raise ExpressionTreeError("Слишком большое значение.", op)
+    return poly
 
-            return left
 
-        left.num_coef -= right.num_coef
-        left_mult = left.mult + right.mult
-        left.mult = left_mult
+class Operations:
 
-        if right.aleft:
-            if left.aleft:
-                self._subtraction(left.aleft, right.aleft)
-            else:
-                left.aleft = right.aleft
-                right.aleft = None
-        return left
+    def __init__(self, degree_cap: Optional[int] = DEGREE_CAP):
+        self._degree_cap = degree_cap
 
-    def _addition(self, left: Node, right: Node) -> Node:
-        if left.power < right.power:
-            left, right = right, left
-
-        if left.power != right.power:
-            left.num_coef += right.num_coef
-            right.num_coef = 0
-            if left.aleft and left.aleft.power >= right.power:
-                self._addition(left.aleft, right)
-                return left
-
-            if left.aleft and left.aleft.power < right.power:
-                aleft = left.aleft
-                left.aleft = right
-                self._addition(right, aleft)
-                return left
-
-            if not left.aleft:
-                left.aleft = right
-                return left
-
-            if right.aleft:
-                if left.aleft:
-                    self._addition(left.aleft, right.aleft)
-                else:
-                    left.aleft = right.aleft
-                    right.aleft = None
-            return left
-
-        left.num_coef += right.num_coef
-        left_mult = left.mult + right.mult
-        left.mult = left_mult
-
-        if right.aleft:
-            if left.aleft:
-                self._addition(left.aleft, right.aleft)
-            else:
-                left.aleft = right.aleft
-                right.aleft = None
-        return left
+    def evaluate(self, op: Node, left: Polynomial, right: Polynomial) \
+            -> Polynomial:
+        if op.text == '*':
+            return self._multiplication(op, left, right)
+        elif op.text == '/':
+            return self._division(op, left, right)
+        elif op.text == '+':
+            return left + right
+        elif op.text == '-':
+            return left - right
+        elif op.text == '^':
+            return self._power(op, left, right)
+        else:
+            raise ExpressionTreeError(f"Что ты мне подсунул? Что это: "
+                                      f"'{op.text}'", op, CODE_SYMBOL)
 
-    def _power(self, left: Node, right: Node) -> Node:
-        if right.token_type == NODE_VAR and right.power:
-            raise ExpressionTreeError("Степень икса? Ушел решать.", right)
+    @staticmethod
+    def _multiplication(op: Node, left: Polynomial, right: Polynomial) \
+            -> Polynomial:
+        return finite(op, left * right)
 
-        right_val = float(right.mult)
+    @staticmethod
+    def _division(op: Node, left: Polynomial, right: Polynomial) \
+            -> Polynomial:
+        if right.is_zero():
+            raise ExpressionTreeError("Деление на ноль", op)
+        quotient, remainder = left.divide(right)
+        scale = max(map(abs, left.coefs), default=0.0)
+        if any(abs(coef) > REMAINDER_TOLERANCE * scale
+               for coef in remainder.coefs):
+            raise ExpressionTreeError(f"Деление на ({right}) не нацело, "
+                                      f"остаток {remainder}.", op)
+        return finite(op, quotient)
+
+    def _power(self, op: Node, left: Polynomial, right: Polynomial) \
+            -> Polynomial:
+        if not right.is_constant():
+            raise ExpressionTreeError("Степень икса? Ушел решать.", op,
+                                      CODE_POWER)
+
+        right_val = right.coefficient(0)
         if not right_val.is_integer():
-            raise ExpressionTreeError("Запрещена дробная степень.", right)
-
-        if not left.power:
-            left.mult **= right_val
-            return left
-
-        if left.num_coef != 0 or left.aleft:
-            raise ExpressionTreeError("Степень для уравнения вида (ax + b) "
-                                      "запрещена.", right)
-
-        left.power *= right_val
-        left.mult **= right_val
-
-        return left
+            raise ExpressionTreeError("Запрещена дробная степень.", op,
+                                      CODE_POWER)
+
+        exponent = int(right_val)
+        if left.is_zero() and exponent < 0:
+            raise ExpressionTreeError("Деление на ноль", op)
+        if exponent < 0 and not left.is_monomial():
+            raise ExpressionTreeError("Отрицательная степень для уравнения "
+                                      "вида (ax + b) запрещена.", op,
+                                      CODE_POWER)
+        if self._degree_cap is not None and not left.is_monomial():
+            self._check_size(op, left, exponent)
+        try:
+            if left.is_constant():
+                return finite(op, Polynomial.constant(
+                    left.coefficient(0) ** right_val))
+            return left ** exponent
+        except OverflowError:
+            raise ExpressionTreeError("Слишком большое значение.", op)
+
+    def _check_size(self, op: Node, left: Polynomial, exponent: int) -> None:
+        if isinstance(left, SparsePolynomial):
+            # t terms to the n-th power give at most C(t + n - 1, n)
+            # distinct powers, however far apart they are.
+            terms = len(left.powers)
+            if math.comb(terms + exponent - 1, exponent) > \
+                    self._degree_cap + 1:
+                raise ExpressionTreeError(f"Число членов результата больше "
+                                          f"{self._degree_cap + 1}.", op,
+                                          CODE_POWER)
+        elif (left.high - left.low) * exponent > self._degree_cap:
+            raise ExpressionTreeError(f"Степень результата больше "
+                                      f"{self._degree_cap}.", op,
+                                      CODE_POWER)
+
+
+class CountingOperations(Operations):
+
+    def __init__(self, degree_cap: Optional[int], counts: Counter):
+        super().__init__(degree_cap)
+        self._counts = counts
+
+    def evaluate(self, op: Node, left: Polynomial, right: Polynomial) \
+            -> Polynomial:
+        self._counts[OPERATION_NAMES.get(op.text, op.text)] += 1
+        return super().evaluate(op, left, right)
@@ -0,0 +1,367 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import collections
+import heapq
+import math
+import warnings
+
+from parse_token import Token, TOKEN_NUM, TOKEN_VAR, TOKEN_OP
+from rpn import ShuntingYard
+from expression_tree import UnarySigns, unary_op
+from errors import ValidateError, ExpressionTreeError, CODE_SYMBOL, \
+    CODE_DEGREE, CODE_POWER, CODE_DEGENERATE
+from result import SystemResult
+from optional import optional_import
+
+# 'auto' takes the sparse path from this many unknowns on, if at most
+# SPARSE_DENSITY of the matrix is filled.
+SPARSE_MIN_SIZE = 200
+SPARSE_DENSITY = 0.05
+# A pivot may be this much smaller than the largest entry of its row, if
+# its column is shorter.
+PIVOT_THRESHOLD = 0.1
+TOLERANCE = 1e-12
+CONSISTENCY_TOLERANCE = 1e-9
+
+Row = Dict[int, float]
+# What a backend returns: the values with every free unknown 0, the
+# method used, the free columns and, for the other columns, their
+# coefficients on the free ones.
+Solved = Tuple[List[float], str, List[int], Dict[int, Row]]
+
+
+class LinearForm:
+
+    __slots__ = ['terms', 'constant']
+
+    def __init__(self, terms: Optional[Dict[str, float]] = None,
+                 constant: float = 0.0):
+        # sum(coef * name) + constant, zero coefficients are not stored.
+        self.terms = {} if terms is None else terms
+        self.constant = constant
+
+    def is_constant(self) -> bool:
+        return not self.terms
+
+    def scale(self, factor: float) -> 'LinearForm':
+        if factor == 0:
+            return LinearForm()
+        return LinearForm({name: coef * factor
+                           for name, coef in self.terms.items()},
+                          self.constant * factor)
+
+    def _combine(self, other: 'LinearForm', sign: float) -> 'LinearForm':
+        terms = dict(self.terms)
+        for name, coef in other.terms.items():
+            value = terms.get(name, 0.0) + sign * coef
+            if value:
+                terms[name] = value
+            else:
+                terms.pop(name, None)
+        return LinearForm(terms, self.constant + sign * other.constant)
+
+    def __add__(self, other: 'LinearForm') -> 'LinearForm':
+        return self._combine(other, 1.0)
+
+    def __sub__(self, other: 'LinearForm') -> 'LinearForm':
+        return self._combine(other, -1.0)
+
+    def __neg__(self) -> 'LinearForm':
+        return self.scale(-1.0)
+
+    def __eq__(self, other):
+        if not isinstance(other, LinearForm):
+            return NotImplemented
+        return self.terms == other.terms and self.constant == other.constant
+
+    def __repr__(self):
+        return f"LinearForm({self.terms!r}, {self.constant!r})"
+
+
+class LinearBuilder:
+
+    def __init__(self):
+        # The emit target of ShuntingYard for one equation of a system:
+        # like PolynomialBuilder, but the values are linear in any number
+        # of named unknowns, so a product of two unknowns is an error.
+        self._values: List[LinearForm] = []
+        self._signs = UnarySigns()
+
+    def push(self, token: Token) -> None:
+        kind = token.kind
+        if kind == TOKEN_NUM:
+            self._values.append(LinearForm(constant=token.value))
+            self._signs.operand()
+        elif kind == TOKEN_VAR:
+            self._values.append(LinearForm({token.text: 1.0}))
+            self._signs.operand()
+        elif kind == TOKEN_OP and token.text in unary_op:
+            if self._signs.unary(token):
+                self._values[-1] = -self._values[-1]
+        elif kind == TOKEN_OP:
+            right = self._values.pop()
+            self._signs.binary()
+            self._values[-1] = self._evaluate(token, self._values[-1], right)
+        else:
+            raise ValidateError("Undefined token", token, CODE_SYMBOL)
+
+    @staticmethod
+    def _evaluate(op: Token, left: LinearForm, right: LinearForm) \
+            -> LinearForm:
+        if op.text == '+':
+            return left + right
+        if op.text == '-':
+            return left - right
+        if op.text == '*':
+            if right.is_constant():
+                return left.scale(right.constant)
+            if left.is_constant():
+                return right.scale(left.constant)
+            raise ExpressionTreeError("Произведение неизвестных, система "
+                                      "не линейна.", op, CODE_DEGREE)
+        if op.text == '/':
+            if not right.is_constant():
+                raise ExpressionTreeError("Деление на неизвестную, система "
+                                          "не линейна.", op, CODE_DEGREE)
+            if right.constant == 0:
+                raise ExpressionTreeError("Деление на ноль", op)
+            return left.scale(1 / right.constant)
+        if op.text == '^':
+            if not right.is_constant():
+                raise ExpressionTreeError("Степень неизвестной? Ушел "
+                                          "решать.", op, CODE_POWER)
+            exponent = right.constant
+            if not exponent.is_integer():
+                raise ExpressionTreeError("Запрещена дробная степень.", op,
+                                          CODE_POWER)
+            if left.is_constant():
+                if left.constant == 0 and exponent < 0:
+                    raise ExpressionTreeError("Деление на ноль", op)
+                try:
+                    return LinearForm(constant=left.constant ** exponent)
+                except OverflowError:
+                    raise ExpressionTreeError("Слишком большое значение.",
+                                              op)
+            if exponent == 0:
+                return LinearForm(constant=1.0)
+            if exponent == 1:
+                return left
+            raise ExpressionTreeError("Степень неизвестной больше 1, "
+                                      "система не линейна.", op,
+                                      CODE_DEGREE)
+        raise ExpressionTreeError(f"Что ты мне подсунул? Что это: "
+                                  f"'{op.text}'", op, CODE_SYMBOL)
+
+    def result(self) -> LinearForm:
+        return self._values[-1]
+
+
+def parse_linear(tokens: Iterable[Token]) -> LinearForm:
+    builder = LinearBuilder()
+    ShuntingYard(tokens, builder.push).run()
+    return builder.result()
+
+
+def build_system(forms: Sequence[LinearForm]) \
+        -> Tuple[List[str], List[Row], List[float]]:
+    # Every form is one row of A x = b, the unknowns are numbered in order
+    # of first appearance.
+    index: Dict[str, int] = {}
+    rows = []
+    rhs = []
+    for form in forms:
+        rows.append({index.setdefault(name, len(index)): coef
+                     for name, coef in form.terms.items()})
+        rhs.append(-form.constant)
+    return list(index), rows, rhs
+
+
+def _residual(rows: Sequence[Row], rhs: Sequence[float],
+              values: Sequence[float]) -> float:
+    return math.sqrt(sum((sum(coef * values[col] for col, coef in row.items())
+                          - rhs_val) ** 2
+                         for row, rhs_val in zip(rows, rhs)))
+
+
+def _coordinates(rows: Sequence[Row]):
+    np = optional_import('numpy')
+    nnz = sum(map(len, rows))
+    row_idx = np.fromiter((i for i, row in enumerate(rows) for _ in row),
+                          dtype=np.intp, count=nnz)
+    col_idx = np.fromiter((col for row in rows for col in row),
+                          dtype=np.intp, count=nnz)
+    data = np.fromiter((coef for row in rows for coef in row.values()),
+                       dtype=float, count=nnz)
+    return data, row_idx, col_idx
+
+
+def solve_dense(rows: Sequence[Row], rhs: Sequence[float], size: int) \
+        -> Solved:
+    # LU through numpy.linalg.solve for a square regular system.
+    # Anything else goes to eliminate(), so that every backend describes
+    # a singular system the same way.
+    np = optional_import('numpy')
+    if np is None:
+        raise ImportError("dense backend requested but numpy is not "
+                          "installed")
+    if len(rows) == size:
+        data, row_idx, col_idx = _coordinates(rows)
+        matrix = np.zeros((size, size))
+        matrix[row_idx, col_idx] = data
+        vector = np.asarray(rhs, dtype=float)
+        try:
+            values = np.linalg.solve(matrix, vector)
+        except np.linalg.LinAlgError:
+            pass
+        else:
+            if _solves(matrix @ values - vector, vector):
+                return values.tolist(), 'lu', [], {}
+    return eliminate(rows, rhs, size)
+
+
+def _solves(residual, vector) -> bool:
+    # LU of a numerically singular matrix may still give finite values,
+    # they are only kept if they do solve the system.
+    np = optional_import('numpy')
+    return bool(np.isfinite(residual).all()) and \
+        float(np.linalg.norm(residual)) <= CONSISTENCY_TOLERANCE * \
+        max(1.0, float(np.linalg.norm(vector)))
+
+
+def eliminate(rows: Sequence[Row], rhs: Sequence[float], size: int) \
+        -> Solved:
+    # Gaussian elimination on rows kept as {column: coefficient}, in
+    # Markowitz order: the unknown left in the fewest equations goes
+    # next, pivoting on the shortest of those equations whose coefficient
+    # is within PIVOT_THRESHOLD of the largest (the larger coefficient on
+    # a tie). This keeps the fill-in low when every equation touches a
+    # few unknowns. Unknowns without a pivot are free.
+    rows = [dict(row) for row in rows]
+    rhs = list(rhs)
+    scale = max((abs(coef) for row in rows for coef in row.values()),
+                default=0.0)
+    drop = TOLERANCE * (scale or 1.0)
+    # Rows not yet used as a pivot, by column.
+    columns: Dict[int, Set[int]] = collections.defaultdict(set)
+    for i, row in enumerate(rows):
+        for col in row:
+            columns[col].add(i)
+    queue = [(len(active), col) for col, active in columns.items()]
+    heapq.heapify(queue)
+    pivots: List[Tuple[int, int]] = []
+    while queue:
+        count, col = heapq.heappop(queue)
+        active = columns[col]
+        if count != len(active) or not active:
+            continue
+        largest = max(abs(rows[k][col]) for k in active)
+        i = min((k for k in active
+                 if abs(rows[k][col]) >= PIVOT_THRESHOLD * largest),
+                key=lambda k: (len(rows[k]), -abs(rows[k][col])))
+        row = rows[i]
+        pivot = row[col]
+        pivots.append((i, col))
+        for other_col in row:
+            columns[other_col].discard(i)
+        for k in active:
+            other = rows[k]
+            factor = other.pop(col) / pivot
+            for other_col, coef in row.items():
+                if other_col == col:
+                    continue
+                value = other.get(other_col, 0.0) - factor * coef
+                if abs(value) > drop:
+                    other[other_col] = value
+                    columns[other_col].add(k)
+                elif other_col in other:
+                    del other[other_col]
+                    columns[other_col].discard(k)
+            rhs[k] -= factor * rhs[i]
+        active.clear()
+        for other_col in row:
+            if other_col != col:
+                heapq.heappush(queue, (len(columns[other_col]), other_col))
+    pivoted = {col for _, col in pivots}
+    free = [col for col in range(size) if col not in pivoted]
+    values = [0.0] * size
+    depends: Dict[int, Row] = {}
+    # A pivot row holds no column pivoted before it, so going back from
+    # the last pivot every other unknown in the row is already known, as
+    # a value plus multiples of the free unknowns.
+    for i, col in reversed(pivots):
+        row = rows[i]
+        pivot = row[col]
+        total = rhs[i]
+        combined: Row = {}
+        for other_col, coef in row.items():
+            if other_col == col:
+                continue
+            total -= coef * values[other_col]
+            if other_col not in pivoted:
+                combined[other_col] = combined.get(other_col, 0.0) - coef
+            for free_col, free_coef in depends.get(other_col, {}).items():
+                combined[free_col] = \
+                    combined.get(free_col, 0.0) - coef * free_coef
+        values[col] = total / pivot
+        combined = {free_col: coef / pivot
+                    for free_col, coef in combined.items()
+                    if abs(coef) > drop}
+        if combined:
+            depends[col] = combined
+    return values, 'gauss', free, depends
+
+
+def solve_sparse(rows: Sequence[Row], rhs: Sequence[float], size: int) \
+        -> Solved:
+    # SuperLU from scipy when it is installed and the system is square
+    # and regular, elimination on dict rows otherwise.
+    sparse_linalg = optional_import('scipy.sparse.linalg') \
+        if len(rows) == size else None
+    if sparse_linalg is not None:
+        np = optional_import('numpy')
+        sparse = optional_import('scipy.sparse')
+        data, row_idx, col_idx = _coordinates(rows)
+        matrix = sparse.csc_matrix((data, (row_idx, col_idx)),
+                                   shape=(size, size))
+        vector = np.asarray(rhs, dtype=float)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            try:
+                values = sparse_linalg.spsolve(matrix, vector)
+            except RuntimeError:
+                values = None
+        if values is not None and _solves(matrix @ values - vector, vector):
+            return values.tolist(), 'splu', [], {}
+    return eliminate(rows, rhs, size)
+
+
+BACKENDS = {'dense': solve_dense, 'sparse': solve_sparse, 'gauss': eliminate}
+
+
+def choose_backend(rows: Sequence[Row], size: int) -> str:
+    nnz = sum(map(len, rows))
+    if optional_import('numpy') is None or size >= SPARSE_MIN_SIZE and \
+            nnz <= SPARSE_DENSITY * len(rows) * size:
+        return 'sparse'
+    return 'dense'
+
+
+def solve_system(forms: Sequence[LinearForm], backend: str = 'auto') \
+        -> SystemResult:
+    names, rows, rhs = build_system(forms)
+    if not names:
+        raise ValidateError("В системе нет неизвестных.",
+                            code=CODE_DEGENERATE)
+    if backend == 'auto':
+        backend = choose_backend(rows, len(names))
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'")
+    values, method, free, depends = BACKENDS[backend](rows, rhs, len(names))
+    residual = _residual(rows, rhs, values)
+    consistent = residual <= CONSISTENCY_TOLERANCE * \
+        max(1.0, math.sqrt(sum(val * val for val in rhs)))
+    return SystemResult(
+        tuple(names), tuple(values), len(names) - len(free), residual,
+        consistent, method, tuple(names[col] for col in free),
+        tuple(tuple((names[free_col], coef)
+                    for free_col, coef in sorted(depends.get(col, {}).items()))
+              for col in range(len(names))))
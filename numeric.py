@@ -0,0 +1,66 @@
+from typing import Optional, Tuple
+import math
+
+REL_TOLERANCE = 4e-16
+MAX_ITERATIONS = 64
+
+
+def newton_sqrt(val: float, rel_tol: Optional[float] = REL_TOLERANCE,
+                abs_tol: Optional[float] = None) -> Tuple[float, int]:
+    if val < 0:
+        raise ValueError("math domain error")
+    if val == 0 or val != val or val == math.inf:
+        return val, 0
+    # val = m * 2^e with 0.5 <= m < 1, so 2^(e/2) is within a factor of
+    # sqrt(2) of the root and Newton needs only a handful of steps.
+    mantissa, exponent = math.frexp(val)
+    x = math.ldexp(0.5 + mantissa / 2, exponent // 2)
+    if exponent % 2:
+        x *= 1.4142135623730951
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        nx = (x + val / x) / 2
+        diff = abs(x - nx)
+        if (rel_tol is not None and diff <= rel_tol * nx) or \
+                (abs_tol is not None and diff < abs_tol):
+            return nx, iteration
+        x = nx
+    return x, MAX_ITERATIONS
+
+
+def sqrt(val: float, rel_tol: Optional[float] = REL_TOLERANCE,
+         abs_tol: Optional[float] = None) -> float:
+    return newton_sqrt(val, rel_tol, abs_tol)[0]
+
+
+def quadratic_roots(a: float, b: float, c: float,
+                    rel_tol: Optional[float] = REL_TOLERANCE) \
+        -> Tuple[float, complex, complex]:
+    # Returns the discriminant and the roots (-b - sqrt(D)) / 2a and
+    # (-b + sqrt(D)) / 2a. The root where -b and sqrt(D) share a sign is
+    # computed directly, the other one from x1 * x2 = c / a, so nothing
+    # cancels when b^2 >> 4ac.
+    disc = b * b - 4 * a * c
+    if math.isfinite(disc):
+        root = sqrt(abs(disc), rel_tol)
+    else:
+        # b^2 or 4ac overflowed. D / m^2 with m = max(|b|, 2 sqrt|ac|)
+        # is formed from ratios up to 1 instead, only D itself is inf.
+        s = 2 * math.sqrt(abs(a)) * math.sqrt(abs(c))
+        m = max(abs(b), s)
+        ac = (s / m) ** 2 if (a > 0) == (c > 0) else -(s / m) ** 2
+        reduced = (b / m) ** 2 - ac
+        disc = reduced * m * m
+        root = sqrt(abs(reduced), rel_tol) * m
+    if disc < 0:
+        centre = -b / (2 * a)
+        spread = abs(root / (2 * a))
+        return disc, complex(centre, -spread), complex(centre, spread)
+    if disc == 0:
+        root = -b / (2 * a)
+        return disc, complex(root), complex(root)
+    q = -(b / 2 + root / 2) if b >= 0 else root / 2 - b / 2
+    big = q / a
+    small = c / q
+    if b >= 0:
+        return disc, complex(big), complex(small)
+    return disc, complex(small), complex(big)
@@ -0,0 +1,17 @@
+from types import ModuleType
+from typing import Dict, Optional
+import importlib
+
+_modules: Dict[str, Optional[ModuleType]] = {}
+
+
+def optional_import(name: str) -> Optional[ModuleType]:
+    # numpy and scipy are imported on first use rather than together with
+    # the modules that use them, numpy alone takes longer to load than a
+    # whole CLI run. None if the package is not installed.
+    if name not in _modules:
+        try:
+            _modules[name] = importlib.import_module(name)
+        except ImportError:
+            _modules[name] = None
+    return _modules[name]
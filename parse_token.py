@@ -1,11 +1,46 @@
+from typing import Optional, Tuple
+
+TOKEN_NUM = 'num'
+TOKEN_VAR = 'var'
+TOKEN_OP = 'op'
+TOKEN_PAREN = 'paren'
+TOKEN_EQUALS = 'eq'
+TOKEN_SPACE = 'space'
+TOKEN_UNKNOWN = 'unknown'
+
+_KINDS = {
+    '+': TOKEN_OP, '-': TOKEN_OP, '*': TOKEN_OP, '/': TOKEN_OP,
+    '^': TOKEN_OP, '@': TOKEN_OP, '#': TOKEN_OP,
+    '(': TOKEN_PAREN, ')': TOKEN_PAREN,
+    'x': TOKEN_VAR, 'X': TOKEN_VAR,
+    '=': TOKEN_EQUALS,
+}
+
+
+def classify(text: str) -> Tuple[str, Optional[float]]:
+    kind = _KINDS.get(text)
+    if kind is not None:
+        return kind, None
+    if text.isspace():
+        return TOKEN_SPACE, None
+    try:
+        return TOKEN_NUM, float(text)
+    except ValueError:
+        return TOKEN_UNKNOWN, None
+
 
 class Token:
 
-    __slots__ = ['text', 'position']
+    __slots__ = ['text', 'position', 'kind', 'value']
 
-    def __init__(self, text: str, position: int):
+    def __init__(self, text: str, position: int, kind: Optional[str] = None,
+                 value: Optional[float] = None):
         self.text = text
         self.position = position
+        if kind is None:
+            kind, value = classify(text)
+        self.kind = kind
+        self.value = value
 
     def __repr__(self):
         return str(self.text)
@@ -14,8 +49,4 @@ class Token:
         return str(self.text)
 
     def isdigit(self) -> bool:
-        try:
-            float(self.text)
-            return True
-        except ValueError:
-            return False
+        return self.kind == TOKEN_NUM
@@ -0,0 +1,662 @@
+from typing import Dict, List, Optional, Tuple, Union
+import bisect
+import math
+
+from optional import optional_import
+
+# Operand sizes (number of coefficients) above which the faster
+# convolutions pay off, see benchmarks/bench_multiply.py.
+KARATSUBA_THRESHOLD = 96
+FFT_THRESHOLD = 32
+# The FFT product is exact after rounding only for integer coefficients
+# while every product coefficient stays below this bound.
+FFT_EXACT_LIMIT = 2.0 ** 40
+# A polynomial spanning at least SPARSE_MIN_SPAN powers, more than
+# SPARSE_RATIO times its number of terms, is kept as a SparsePolynomial.
+SPARSE_MIN_SPAN = 64
+SPARSE_RATIO = 4
+
+
+def _schoolbook(a: List[float], b: List[float]) -> List[float]:
+    if len(a) < len(b):
+        a, b = b, a
+    size = len(a)
+    res = [0.0] * (size + len(b) - 1)
+    for i, coef in enumerate(b):
+        if coef:
+            res[i:i + size] = [r + coef * x
+                               for r, x in zip(res[i:i + size], a)]
+    return res
+
+
+def _add_into(res: List[float], values: List[float], shift: int,
+              sign: float = 1.0) -> None:
+    end = shift + len(values)
+    res[shift:end] = [r + sign * v for r, v in zip(res[shift:end], values)]
+
+
+def _karatsuba(a: List[float], b: List[float]) -> List[float]:
+    if len(a) < len(b):
+        a, b = b, a
+    if len(b) <= KARATSUBA_THRESHOLD:
+        return _schoolbook(a, b)
+    half = len(a) // 2
+    res = [0.0] * (len(a) + len(b) - 1)
+    a0, a1 = a[:half], a[half:]
+    if len(b) <= half:
+        _add_into(res, _karatsuba(a0, b), 0)
+        _add_into(res, _karatsuba(a1, b), half)
+        return res
+    b0, b1 = b[:half], b[half:]
+    low = _karatsuba(a0, b0)
+    high = _karatsuba(a1, b1)
+    a_sum = a1[:]
+    _add_into(a_sum, a0, 0)
+    b_sum = b1[:] if len(b1) >= half else b0[:]
+    _add_into(b_sum, b0 if len(b1) >= half else b1, 0)
+    middle = _karatsuba(a_sum, b_sum)
+    _add_into(middle, low, 0, -1.0)
+    _add_into(middle, high, 0, -1.0)
+    _add_into(res, low, 0)
+    _add_into(res, middle[:len(res) - half], half)
+    _add_into(res, high, 2 * half)
+    return res
+
+
+def _fft(a: List[float], b: List[float]) -> Optional[List[float]]:
+    np = optional_import('numpy')
+    if np is None:
+        return None
+    left = np.asarray(a, dtype=float)
+    right = np.asarray(b, dtype=float)
+    bound = (float(np.abs(left).max()) * float(np.abs(right).max()) *
+             min(len(a), len(b)))
+    if not (bound < FFT_EXACT_LIMIT and
+            np.array_equal(np.rint(left), left) and
+            np.array_equal(np.rint(right), right)):
+        return None
+    size = len(a) + len(b) - 1
+    nfft = 1 << (size - 1).bit_length()
+    res = np.fft.irfft(np.fft.rfft(left, nfft) * np.fft.rfft(right, nfft),
+                       nfft)[:size]
+    return np.rint(res).tolist()
+
+
+def convolve(a: List[float], b: List[float]) -> List[float]:
+    size = min(len(a), len(b))
+    if size > FFT_THRESHOLD:
+        res = _fft(a, b)
+        if res is not None:
+            return res
+    if size > KARATSUBA_THRESHOLD:
+        return _karatsuba(a, b)
+    return _schoolbook(a, b)
+
+
+def _synthetic_division(dividend: List[float], divisor: List[float]) \
+        -> Tuple[List[float], List[float]]:
+    # divisor is b + a X: divide by (X - r) with r = -b / a, then by a.
+    b, a = divisor
+    root = -b / a
+    if len(dividend) < 2:
+        return [], dividend[:]
+    carry = 0.0
+    quotient = []
+    for coef in reversed(dividend):
+        carry = coef + root * carry
+        quotient.append(carry)
+    remainder = quotient.pop()
+    return [coef / a for coef in reversed(quotient)], [remainder]
+
+
+def _long_division(dividend: List[float], divisor: List[float]) \
+        -> Tuple[List[float], List[float]]:
+    size = len(divisor)
+    if len(dividend) < size:
+        return [], dividend[:]
+    remainder = dividend[:]
+    lead = divisor[-1]
+    quotient = [0.0] * (len(dividend) - size + 1)
+    for shift in range(len(quotient) - 1, -1, -1):
+        coef = remainder[shift + size - 1] / lead
+        quotient[shift] = coef
+        if coef:
+            remainder[shift:shift + size] = [
+                r - coef * d
+                for r, d in zip(remainder[shift:shift + size], divisor)]
+        remainder[shift + size - 1] = 0.0
+    return quotient, remainder[:size - 1]
+
+
+class Horner:
+
+    __slots__ = ['coefs', 'low', 'derivative']
+
+    def __init__(self, coefs: List[float], low: int = 0,
+                 derivative: bool = False):
+        self.coefs = coefs
+        self.low = low
+        self.derivative = derivative
+
+    def __call__(self, x):
+        # Evaluates sum coefs[i] * x ^ (low + i) for a number or, with numpy,
+        # elementwise for an array. With derivative=True returns the pair
+        # (value, d value / dx) from the same pass.
+        if not isinstance(x, (int, float, complex)):
+            np = optional_import('numpy')
+            if np is not None:
+                return self._evaluate_array(np.asarray(x))
+        value = 0.0
+        slope = 0.0
+        for coef in reversed(self.coefs):
+            slope = slope * x + value
+            value = value * x + coef
+        return self._shift(x, value, slope)
+
+    def _evaluate_array(self, x):
+        np = optional_import('numpy')
+        if not np.issubdtype(x.dtype, np.inexact):
+            x = x.astype(np.float64)
+        value = np.zeros(x.shape, np.result_type(x, 0.0))
+        slope = np.zeros_like(value) if self.derivative else None
+        # In place, so a call allocates two arrays whatever the degree.
+        for coef in reversed(self.coefs):
+            if slope is not None:
+                slope *= x
+                slope += value
+            value *= x
+            value += coef
+        return self._shift(x, value, slope)
+
+    def _shift(self, x, value, slope):
+        if self.low:
+            scale = x ** self.low
+            if self.derivative:
+                slope = slope * scale + \
+                    self.low * value * x ** (self.low - 1)
+            value = value * scale
+        if self.derivative:
+            return value, slope
+        return value
+
+
+class Polynomial:
+
+    __slots__ = ['coefs', 'low']
+
+    def __init__(self, coefs: List[float], low: int = 0):
+        # coefs[i] is the coefficient of X ^ (low + i)
+        start = 0
+        end = len(coefs)
+        while end > start and coefs[end - 1] == 0:
+            end -= 1
+        while start < end and coefs[start] == 0:
+            start += 1
+        if start or end < len(coefs):
+            coefs = coefs[start:end]
+        self.coefs = coefs
+        self.low = low + start if coefs else 0
+
+    @classmethod
+    def constant(cls, value: float) -> 'Polynomial':
+        return cls([value])
+
+    @classmethod
+    def monomial(cls, coef: float, power: int) -> 'Polynomial':
+        return cls([coef], power)
+
+    @property
+    def high(self) -> int:
+        return self.low + len(self.coefs) - 1
+
+    @property
+    def degree(self) -> int:
+        return self.high if self.coefs else 0
+
+    def is_zero(self) -> bool:
+        return not self.coefs
+
+    def is_constant(self) -> bool:
+        return not self.coefs or (self.low == 0 and len(self.coefs) == 1)
+
+    def is_monomial(self) -> bool:
+        return len(self.coefs) <= 1
+
+    def is_finite(self) -> bool:
+        return all(map(math.isfinite, self.coefs))
+
+    def coefficient(self, power: int) -> float:
+        index = power - self.low
+        if 0 <= index < len(self.coefs):
+            return self.coefs[index]
+        return 0.0
+
+    def terms(self) -> List[Tuple[int, float]]:
+        low = self.low
+        return [(low + i, coef) for i, coef in enumerate(self.coefs)
+                if coef != 0][::-1]
+
+    def __add__(self, other: 'AnyPolynomial') -> 'AnyPolynomial':
+        if isinstance(other, SparsePolynomial):
+            return other + self
+        if not other.coefs:
+            return self
+        if not self.coefs:
+            return other
+        low = min(self.low, other.low)
+        if is_sparse(max(self.high, other.high) - low + 1,
+                     len(self.coefs) + len(other.coefs)):
+            return SparsePolynomial.from_dense(self) + other
+        coefs = [0.0] * (max(self.high, other.high) - low + 1)
+        start = self.low - low
+        coefs[start:start + len(self.coefs)] = self.coefs
+        start = other.low - low
+        end = start + len(other.coefs)
+        coefs[start:end] = [a + b for a, b in zip(coefs[start:end],
+                                                  other.coefs)]
+        return Polynomial(coefs, low)
+
+    def __sub__(self, other: 'AnyPolynomial') -> 'AnyPolynomial':
+        return self + (-other)
+
+    def __neg__(self) -> 'Polynomial':
+        return Polynomial([-coef for coef in self.coefs], self.low)
+
+    def __eq__(self, other):
+        if isinstance(other, SparsePolynomial):
+            return self.terms() == other.terms()
+        if not isinstance(other, Polynomial):
+            return NotImplemented
+        return self.low == other.low and self.coefs == other.coefs
+
+    def __hash__(self):
+        return hash(tuple(self.terms()))
+
+    def scale(self, factor: float, shift: int = 0) -> 'Polynomial':
+        return Polynomial([coef * factor for coef in self.coefs],
+                          self.low + shift)
+
+    def __mul__(self, other: 'AnyPolynomial') -> 'AnyPolynomial':
+        if isinstance(other, SparsePolynomial):
+            return other * self
+        if not self.coefs or not other.coefs:
+            return Polynomial([])
+        if len(other.coefs) == 1:
+            return self.scale(other.coefs[0], other.low)
+        if len(self.coefs) == 1:
+            return other.scale(self.coefs[0], self.low)
+        return Polynomial(convolve(self.coefs, other.coefs),
+                          self.low + other.low)
+
+    def __pow__(self, exponent: int) -> 'Polynomial':
+        if exponent < 0:
+            if len(self.coefs) != 1:
+                raise ValueError("negative power of a multi-term polynomial")
+            return Polynomial([self.coefs[0] ** exponent],
+                              self.low * exponent)
+        if exponent == 0:
+            return Polynomial.constant(1.0)
+        if len(self.coefs) <= 1:
+            return Polynomial([coef ** exponent for coef in self.coefs],
+                              self.low * exponent)
+        nonzero = [(i, coef) for i, coef in enumerate(self.coefs) if coef]
+        if len(nonzero) == 2:
+            return self._binomial_power(nonzero, exponent)
+        res = None
+        base = self
+        while True:
+            if exponent & 1:
+                res = base if res is None else _finite(res * base)
+            exponent >>= 1
+            if not exponent:
+                return res
+            base = _finite(base * base)
+
+    def _binomial_power(self, nonzero: List[Tuple[int, float]],
+                        exponent: int) -> 'Polynomial':
+        # (u X^p + v X^q) ^ n = sum C(n, k) u^(n-k) v^k X^(p(n-k) + qk)
+        (low, v), (high, u) = nonzero
+        return _binomial_power(self.low + low, v, self.low + high, u,
+                               exponent)
+
+    def divide(self, divisor: 'AnyPolynomial') \
+            -> Tuple['AnyPolynomial', 'AnyPolynomial']:
+        # Returns quotient and remainder with
+        # self = quotient * divisor + remainder.
+        if isinstance(divisor, SparsePolynomial):
+            return SparsePolynomial.from_dense(self).divide(divisor)
+        if not divisor.coefs:
+            raise ZeroDivisionError("polynomial division by zero")
+        if len(divisor.coefs) == 1:
+            return self.scale(1 / divisor.coefs[0], -divisor.low), \
+                Polynomial([])
+        # self / divisor = X^shift * N / D where N and D are the coefficient
+        # lists, a positive shift is folded into N as leading zeros.
+        shift = self.low - divisor.low
+        dividend = self.coefs
+        if shift > 0:
+            dividend = [0.0] * shift + dividend
+        if len(divisor.coefs) == 2:
+            quotient, remainder = _synthetic_division(dividend, divisor.coefs)
+        else:
+            quotient, remainder = _long_division(dividend, divisor.coefs)
+        return Polynomial(quotient, min(shift, 0)), \
+            Polynomial(remainder, min(self.low, divisor.low))
+
+    def monic(self) -> 'Polynomial':
+        if not self.coefs:
+            return self
+        lead = self.coefs[-1]
+        return Polynomial([coef / lead for coef in self.coefs], self.low)
+
+    def factor_low(self) -> Tuple[int, 'Polynomial']:
+        # self = X ^ power * rest, rest has a nonzero constant term.
+        return self.low, Polynomial(self.coefs)
+
+    def compile(self, derivative: bool = False) -> Horner:
+        return Horner(self.coefs, self.low, derivative)
+
+    def __repr__(self):
+        return format_terms(self.terms())
+
+
+class SparseHorner:
+
+    __slots__ = ['powers', 'coefs', 'derivative']
+
+    def __init__(self, powers: List[int], coefs: List[float],
+                 derivative: bool = False):
+        self.powers = powers
+        self.coefs = coefs
+        self.derivative = derivative
+
+    def __call__(self, x):
+        # Horner's rule over the gaps between powers: x ^ gap is one pow()
+        # per term, however far apart the powers are. Same results as
+        # Horner.
+        if not isinstance(x, (int, float, complex)):
+            np = optional_import('numpy')
+            if np is not None:
+                x = np.asarray(x)
+                if not np.issubdtype(x.dtype, np.inexact):
+                    x = x.astype(np.float64)
+        value = 0.0
+        slope = 0.0
+        previous = None
+        for power, coef in zip(reversed(self.powers), reversed(self.coefs)):
+            if previous is not None:
+                gap = previous - power
+                if self.derivative:
+                    slope = slope * x ** gap + gap * value * x ** (gap - 1)
+                value = value * x ** gap
+            value = value + coef
+            previous = power
+        if previous:
+            if self.derivative:
+                slope = slope * x ** previous + \
+                    previous * value * x ** (previous - 1)
+            value = value * x ** previous
+        if self.derivative:
+            return value, slope
+        return value
+
+
+class SparsePolynomial:
+
+    __slots__ = ['powers', 'coefs']
+
+    def __init__(self, powers: List[int], coefs: List[float]):
+        # Terms coefs[i] * X ^ powers[i] with exact integer powers in
+        # increasing order and no zero coefficients. Operations return
+        # whichever of SparsePolynomial and Polynomial fits the result.
+        self.powers = powers
+        self.coefs = coefs
+
+    @classmethod
+    def from_dense(cls, poly: Polynomial) -> 'SparsePolynomial':
+        low = poly.low
+        powers = []
+        coefs = []
+        for i, coef in enumerate(poly.coefs):
+            if coef:
+                powers.append(low + i)
+                coefs.append(coef)
+        return cls(powers, coefs)
+
+    @classmethod
+    def from_terms(cls, terms: Dict[int, float]) -> 'AnyPolynomial':
+        powers = sorted(power for power, coef in terms.items() if coef)
+        return make_polynomial(powers, [terms[power] for power in powers])
+
+    @property
+    def low(self) -> int:
+        return self.powers[0] if self.powers else 0
+
+    @property
+    def high(self) -> int:
+        return self.powers[-1] if self.powers else -1
+
+    @property
+    def degree(self) -> int:
+        return self.high if self.powers else 0
+
+    def is_zero(self) -> bool:
+        return not self.powers
+
+    def is_constant(self) -> bool:
+        return not self.powers or self.powers == [0]
+
+    def is_monomial(self) -> bool:
+        return len(self.powers) <= 1
+
+    def is_finite(self) -> bool:
+        return all(map(math.isfinite, self.coefs))
+
+    def coefficient(self, power: int) -> float:
+        index = bisect.bisect_left(self.powers, power)
+        if index < len(self.powers) and self.powers[index] == power:
+            return self.coefs[index]
+        return 0.0
+
+    def terms(self) -> List[Tuple[int, float]]:
+        return list(zip(reversed(self.powers), reversed(self.coefs)))
+
+    def __add__(self, other: 'AnyPolynomial') -> 'AnyPolynomial':
+        if isinstance(other, Polynomial):
+            other = SparsePolynomial.from_dense(other)
+        # Merge of the two sorted power lists.
+        a_powers, a_coefs = self.powers, self.coefs
+        b_powers, b_coefs = other.powers, other.coefs
+        powers = []
+        coefs = []
+        i = j = 0
+        while i < len(a_powers) and j < len(b_powers):
+            if a_powers[i] < b_powers[j]:
+                powers.append(a_powers[i])
+                coefs.append(a_coefs[i])
+                i += 1
+            elif a_powers[i] > b_powers[j]:
+                powers.append(b_powers[j])
+                coefs.append(b_coefs[j])
+                j += 1
+            else:
+                coef = a_coefs[i] + b_coefs[j]
+                if coef:
+                    powers.append(a_powers[i])
+                    coefs.append(coef)
+                i += 1
+                j += 1
+        powers += a_powers[i:] + b_powers[j:]
+        coefs += a_coefs[i:] + b_coefs[j:]
+        return make_polynomial(powers, coefs)
+
+    def __radd__(self, other: Polynomial) -> 'AnyPolynomial':
+        return self + other
+
+    def __sub__(self, other: 'AnyPolynomial') -> 'AnyPolynomial':
+        return self + (-other)
+
+    def __neg__(self) -> 'SparsePolynomial':
+        return SparsePolynomial(self.powers, [-coef for coef in self.coefs])
+
+    def __eq__(self, other):
+        if not isinstance(other, (Polynomial, SparsePolynomial)):
+            return NotImplemented
+        return self.terms() == other.terms()
+
+    def __hash__(self):
+        return hash(tuple(self.terms()))
+
+    def scale(self, factor: float, shift: int = 0) -> 'AnyPolynomial':
+        terms = [(power + shift, coef * factor)
+                 for power, coef in zip(self.powers, self.coefs)
+                 if coef * factor]
+        return make_polynomial([power for power, _ in terms],
+                               [coef for _, coef in terms])
+
+    def __mul__(self, other: 'AnyPolynomial') -> 'AnyPolynomial':
+        if isinstance(other, Polynomial):
+            other = SparsePolynomial.from_dense(other)
+        if not self.powers or not other.powers:
+            return Polynomial([])
+        if len(other.powers) == 1:
+            return self.scale(other.coefs[0], other.powers[0])
+        if len(self.powers) == 1:
+            return other.scale(self.coefs[0], self.powers[0])
+        products: Dict[int, float] = {}
+        for a_power, a_coef in zip(self.powers, self.coefs):
+            for b_power, b_coef in zip(other.powers, other.coefs):
+                power = a_power + b_power
+                products[power] = products.get(power, 0.0) + a_coef * b_coef
+        return SparsePolynomial.from_terms(products)
+
+    def __rmul__(self, other: Polynomial) -> 'AnyPolynomial':
+        return self * other
+
+    def __pow__(self, exponent: int) -> 'AnyPolynomial':
+        if exponent < 0:
+            if len(self.powers) != 1:
+                raise ValueError("negative power of a multi-term polynomial")
+            return Polynomial([self.coefs[0] ** exponent],
+                              self.powers[0] * exponent)
+        if exponent == 0:
+            return Polynomial.constant(1.0)
+        if len(self.powers) <= 1:
+            return make_polynomial([power * exponent
+                                    for power in self.powers],
+                                   [coef ** exponent for coef in self.coefs])
+        if len(self.powers) == 2:
+            return _binomial_power(self.powers[0], self.coefs[0],
+                                   self.powers[1], self.coefs[1], exponent)
+        res = None
+        base: AnyPolynomial = self
+        while True:
+            if exponent & 1:
+                res = base if res is None else _finite(res * base)
+            exponent >>= 1
+            if not exponent:
+                return res
+            base = _finite(base * base)
+
+    def divide(self, divisor: 'AnyPolynomial') \
+            -> Tuple['AnyPolynomial', 'AnyPolynomial']:
+        if divisor.is_monomial():
+            if divisor.is_zero():
+                raise ZeroDivisionError("polynomial division by zero")
+            (power, coef), = divisor.terms()
+            return self.scale(1 / coef, -power), Polynomial([])
+        # Anything else is divided densely, the quotient and remainder
+        # are made sparse again if they are.
+        if isinstance(divisor, SparsePolynomial):
+            divisor = divisor.to_dense()
+        quotient, remainder = self.to_dense().divide(divisor)
+        return _choose(quotient), _choose(remainder)
+
+    def to_dense(self) -> Polynomial:
+        if not self.powers:
+            return Polynomial([])
+        low = self.powers[0]
+        coefs = [0.0] * (self.powers[-1] - low + 1)
+        for power, coef in zip(self.powers, self.coefs):
+            coefs[power - low] = coef
+        return Polynomial(coefs, low)
+
+    def monic(self) -> 'SparsePolynomial':
+        if not self.powers:
+            return self
+        lead = self.coefs[-1]
+        return SparsePolynomial(self.powers,
+                                [coef / lead for coef in self.coefs])
+
+    def factor_low(self) -> Tuple[int, 'AnyPolynomial']:
+        low = self.low
+        return low, make_polynomial([power - low for power in self.powers],
+                                    self.coefs)
+
+    def compile(self, derivative: bool = False) -> SparseHorner:
+        return SparseHorner(self.powers, self.coefs, derivative)
+
+    def __repr__(self):
+        return format_terms(self.terms())
+
+
+AnyPolynomial = Union[Polynomial, SparsePolynomial]
+
+
+def is_sparse(span: int, terms: int) -> bool:
+    return span >= SPARSE_MIN_SPAN and span > SPARSE_RATIO * terms
+
+
+def make_polynomial(powers: List[int], coefs: List[float]) -> AnyPolynomial:
+    # powers are increasing and every coef is nonzero.
+    if not powers:
+        return Polynomial([])
+    sparse = SparsePolynomial(powers, coefs)
+    if is_sparse(powers[-1] - powers[0] + 1, len(powers)):
+        return sparse
+    return sparse.to_dense()
+
+
+def _choose(poly: Polynomial) -> AnyPolynomial:
+    if is_sparse(len(poly.coefs), sum(1 for coef in poly.coefs if coef)):
+        return SparsePolynomial.from_dense(poly)
+    return poly
+
+
+def _finite(poly: AnyPolynomial) -> AnyPolynomial:
+    # Float products overflow to inf silently, unlike float powers.
+    if not poly.is_finite():
+        raise OverflowError("polynomial coefficient out of range")
+    return poly
+
+
+def _binomial_power(low: int, v: float, high: int, u: float,
+                    exponent: int) -> AnyPolynomial:
+    # (v X^low + u X^high) ^ n = sum C(n, k) u^(n-k) v^k X^(high(n-k) + low k)
+    powers = []
+    coefs = []
+    for k in range(exponent, -1, -1):
+        coef = math.comb(exponent, k) * u ** (exponent - k) * v ** k
+        if not math.isfinite(coef):
+            raise OverflowError("polynomial coefficient out of range")
+        if coef:
+            powers.append(high * (exponent - k) + low * k)
+            coefs.append(coef)
+    return make_polynomial(powers, coefs)
+
+
+def format_terms(terms: List[Tuple[int, float]]) -> str:
+    if not terms:
+        return "0"
+    res = []
+    for i, (power, mult) in enumerate(terms):
+        if i and mult >= 0:
+            res.append("+")
+        if mult == 1.0:
+            res.append("")
+        elif mult.is_integer():
+            res.append(f"{int(mult)}")
+        else:
+            res.append(f"{round(mult, 2):.2}")
+        res.append(f"X^{power}")
+    return "".join(res)
@@ -0,0 +1,65 @@
+from typing import Callable, Counter, Dict, Optional
+import collections
+import contextlib
+import io
+import time
+
+STAGES = ['tokenize', 'rpn', 'tree', 'simplify', 'solve']
+
+
+class Profile:
+
+    __slots__ = ['equations', 'stages', 'counters', 'operations',
+                 'max_depth', 'hook']
+
+    def __init__(self, hook: Optional[Callable[['Profile'], None]] = None):
+        # One Profile can be passed to many evaluate() calls, the numbers
+        # then add up. hook, if given, is called after every equation.
+        self.equations = 0
+        self.stages: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+        self.counters: Counter = collections.Counter()
+        self.operations: Counter = collections.Counter()
+        self.max_depth = 0
+        self.hook = hook
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + \
+                time.perf_counter() - start
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] += value
+
+    def depth(self, value: int) -> None:
+        self.max_depth = max(self.max_depth, value)
+
+    def finish(self) -> None:
+        self.equations += 1
+        if self.hook is not None:
+            self.hook(self)
+
+    def report(self) -> dict:
+        return {"equations": self.equations,
+                "stages": dict(self.stages),
+                "total": sum(self.stages.values()),
+                "counters": dict(self.counters),
+                "operations": dict(self.operations),
+                "max_depth": self.max_depth}
+
+    def format(self) -> str:
+        buffer = io.StringIO()
+        total = sum(self.stages.values()) or 1.0
+        buffer.write(f"Профиль ({self.equations} уравн.):\n")
+        for name, seconds in self.stages.items():
+            buffer.write(f"\t{name:<10}{seconds * 1e3:12.3f} мс "
+                         f"{seconds / total:6.1%}\n")
+        for name, value in sorted(self.counters.items()):
+            buffer.write(f"\t{name:<16}{value:>10}\n")
+        for name, value in sorted(self.operations.items()):
+            buffer.write(f"\t{name:<16}{value:>10}\n")
+        buffer.write(f"\t{'max_depth':<16}{self.max_depth:>10}\n")
+        return buffer.getvalue()
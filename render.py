@@ -0,0 +1,152 @@
+from typing import List, Optional, TextIO, Tuple
+import io
+import sys
+
+from errors import Diagnostic
+from result import EquationResult, SystemResult
+
+
+def format_real(val: float) -> str:
+    val = round(val, 2)
+    if val.is_integer():
+        return f"{int(val)}"
+    return f"{val:.2f}"
+
+
+def format_root(root: complex) -> str:
+    if not root.imag:
+        return format_real(root.real)
+    sign = '-' if root.imag < 0 else '+'
+    return f"{format_real(root.real)} {sign} {format_real(abs(root.imag))}i"
+
+
+def _degree_notes(degree: int, discriminant: Optional[float]) -> List[str]:
+    if degree == 1:
+        return ["Уравнение первой степени. Возможно только одно решение."]
+    if degree == 2:
+        if discriminant < 0:
+            return ["Значение дискриминанта меньше 0. Действительных "
+                    "решений нет."]
+        if discriminant == 0:
+            return ["Дискриминант равен нулю. Доступно одно решение."]
+        return ["Дискриминант больше нуля. Доступно два решения."]
+    return [f"Уравнение {degree}-й степени. Корни найдены численно."]
+
+
+def _reduced_notes(degree: int, discriminant: Optional[float]) -> List[str]:
+    # Notes on what is left once X^k is taken out: X = 0 is a root anyway.
+    if degree == 1:
+        return ["Остается уравнение первой степени с одним решением."]
+    if degree == 2:
+        if discriminant < 0:
+            return ["Дискриминант оставшегося квадратного уравнения меньше "
+                    "0. Других действительных решений нет."]
+        if discriminant == 0:
+            return ["Дискриминант оставшегося квадратного уравнения равен "
+                    "нулю. Оно дает еще одно решение."]
+        return ["Дискриминант оставшегося квадратного уравнения больше "
+                "нуля. Оно дает еще два решения."]
+    return [f"Остается уравнение {degree}-й степени. Его корни найдены "
+            f"численно."]
+
+
+def format_notes(result: EquationResult) -> List[str]:
+    if result.factored:
+        return [f"Вынесен множитель X^{result.factored}, X = 0 - корень."] \
+            + _reduced_notes(result.degree - result.factored,
+                             result.discriminant)
+    return _degree_notes(result.degree, result.discriminant)
+
+
+def format_answer(result: EquationResult) -> str:
+    roots = result.roots
+    if result.degree == 1:
+        res = roots[0].real
+        if not res.is_integer():
+            res = f"{round(res, 2):.2f}"
+        return f"Результат:\n\tX = {res}"
+    if result.degree == 2 and not result.factored and \
+            result.discriminant < 0:
+        res1 = f"{roots[0].real:.2} - {round(abs(roots[0].imag), 2):.2}i"
+        res2 = f"{roots[1].real:.2} + {round(abs(roots[1].imag), 2):.2}i"
+        return f"Результат:\n\tX1 = {res1}, X2 = {res2}"
+    if len(roots) == 1:
+        return f"Результат:\n\tX = {format_root(roots[0])}"
+    res = ", ".join(f"X{i} = {format_root(root)}"
+                    for i, root in enumerate(roots, 1))
+    return f"Результат:\n\t{res}"
+
+
+def render_header(equation_src: str) -> str:
+    tail = "" if "=" in equation_src else " = 0"
+    return f"\nComputor v1\n\nИсходное уравнение:\n{equation_src}{tail}\n"
+
+
+def render(result: EquationResult, verbose: bool = False,
+           quiet: bool = False) -> str:
+    buffer = io.StringIO()
+    if verbose:
+        buffer.write("Обратная польская нотация:\n\t")
+        buffer.write(" ".join(result.rpn))
+        buffer.write("\n")
+    if not quiet:
+        buffer.write(f"Упрощенная форма:\n\t{result.simplified} = 0\n")
+        for note in format_notes(result):
+            buffer.write(note)
+            buffer.write("\n")
+    buffer.write(format_answer(result))
+    buffer.write("\n")
+    return buffer.getvalue()
+
+
+def format_system_notes(result: SystemResult) -> List[str]:
+    if not result.consistent:
+        return ["Система несовместна, решений нет."]
+    if result.free:
+        return [f"Система имеет бесконечно много решений. Свободные "
+                f"неизвестные: {', '.join(result.free)}."]
+    return ["Система имеет единственное решение."]
+
+
+def format_unknown(value: float, depends: Tuple[Tuple[str, float], ...]) \
+        -> str:
+    # value + sum coef * name, as "2 - b" or "1 + 0.50 * c".
+    parts = [format_real(value)] if value or not depends else []
+    for name, coef in depends:
+        term = name if round(abs(coef), 2) == 1 else \
+            f"{format_real(abs(coef))} * {name}"
+        if parts:
+            parts.append(f"{'-' if coef < 0 else '+'} {term}")
+        else:
+            parts.append(f"-{term}" if coef < 0 else term)
+    return " ".join(parts)
+
+
+def render_system(result: SystemResult, quiet: bool = False) -> str:
+    buffer = io.StringIO()
+    if not quiet:
+        buffer.write(f"Неизвестных: {len(result.names)}, ранг: "
+                     f"{result.rank}, метод: {result.method}\n")
+        for note in format_system_notes(result):
+            buffer.write(note)
+            buffer.write("\n")
+    buffer.write("Результат:\n")
+    if not result.consistent:
+        buffer.write("\tРешений нет.\n")
+        return buffer.getvalue()
+    depends = result.depends or [()] * len(result.names)
+    for name, value, terms in zip(result.names, result.values, depends):
+        if name in result.free:
+            buffer.write(f"\t{name} - любое число\n")
+        else:
+            buffer.write(f"\t{name} = {format_unknown(value, terms)}\n")
+    return buffer.getvalue()
+
+
+def render_diagnostic(exc: Diagnostic) -> str:
+    return exc.format() + "\n"
+
+
+def write(text: str, out: TextIO = sys.stdout) -> None:
+    out.write(text)
+    out.flush()
@@ -0,0 +1,22 @@
+import collections
+
+# factored is the power of X taken out of the polynomial before solving,
+# X = 0 is then one of the roots.
+Solution = collections.namedtuple('Solution',
+                                  ['degree', 'discriminant', 'roots',
+                                   'factored'], defaults=[0])
+
+EquationResult = collections.namedtuple('EquationResult',
+                                        ['rpn', 'simplified', 'degree',
+                                         'discriminant', 'roots',
+                                         'factored'], defaults=[0])
+
+# values[i] belongs to names[i]. rank below len(names) means the unknowns
+# are not all determined: those in free may take any value, values holds
+# the solution with all of them 0, and depends[i] lists the (name, coef)
+# pairs to add for unknown i, coef times the value of a free unknown.
+SystemResult = collections.namedtuple('SystemResult',
+                                      ['names', 'values', 'rank',
+                                       'residual', 'consistent', 'method',
+                                       'free', 'depends'],
+                                      defaults=[(), ()])
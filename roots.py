@@ -0,0 +1,102 @@
+from typing import List, Sequence
+import cmath
+import math
+
+from optional import optional_import
+
+MAX_ITERATIONS = 500
+TOLERANCE = 1e-13
+# Copies of a root of multiplicity m scatter by about eps ^ (1 / m). Real
+# parts closer than this (relative) are ordered as equal.
+ORDER_TOLERANCE = 1e-4
+
+
+def find_roots(coefs: Sequence[float], backend: str = 'auto') \
+        -> List[complex]:
+    # coefs[i] is the coefficient of X ^ i, the leading one must not be zero
+    if not all(map(math.isfinite, coefs)):
+        raise ValueError("polynomial coefficients must be finite")
+    zeros = 0
+    while zeros < len(coefs) - 1 and coefs[zeros] == 0:
+        zeros += 1
+    coefs = list(coefs[zeros:])
+    np = optional_import('numpy') if backend in ('auto', 'numpy') else None
+    if backend == 'auto':
+        backend = 'numpy' if np is not None else 'aberth'
+    if len(coefs) < 2:
+        roots = []
+    elif backend == 'numpy':
+        if np is None:
+            raise ImportError("numpy backend requested but numpy is not "
+                              "installed")
+        roots = [complex(root) for root in np.roots(coefs[::-1])]
+    elif backend == 'aberth':
+        roots = aberth(coefs)
+    else:
+        raise ValueError(f"Unknown backend '{backend}'")
+    return [0j] * zeros + roots
+
+
+def _initial_guess(coefs: List[float]) -> List[complex]:
+    degree = len(coefs) - 1
+    # Geometric mean of the root moduli, the product of the roots is a0/an.
+    radius = abs(coefs[0] / coefs[-1]) ** (1 / degree) or 1.0
+    return [radius * cmath.exp(1j * (2 * math.pi * k / degree + 0.4))
+            for k in range(degree)]
+
+
+def aberth(coefs: List[float]) -> List[complex]:
+    degree = len(coefs) - 1
+    lead = coefs[-1]
+    monic = [coef / lead for coef in coefs[::-1]]
+    derivative = [coef * (degree - i) for i, coef in enumerate(monic[:-1])]
+    roots = _initial_guess(coefs)
+    active = list(range(degree))
+    for _ in range(MAX_ITERATIONS):
+        if not active:
+            break
+        moving = []
+        for k in active:
+            z = roots[k]
+            p = 0j
+            for coef in monic:
+                p = p * z + coef
+            if p == 0:
+                continue
+            dp = 0j
+            for coef in derivative:
+                dp = dp * z + coef
+            ratio = p / dp if dp != 0 else p
+            repulsion = 0j
+            for j in range(degree):
+                if j != k:
+                    diff = z - roots[j]
+                    if diff != 0:
+                        repulsion += 1 / diff
+            denominator = 1 - ratio * repulsion
+            step = ratio / denominator if denominator != 0 else ratio
+            roots[k] = z - step
+            if abs(step) > TOLERANCE * max(1.0, abs(z)):
+                moving.append(k)
+        active = moving
+    return roots
+
+
+def clean_roots(roots: List[complex], tolerance: float = 1e-9) \
+        -> List[complex]:
+    res = []
+    for root in roots:
+        scale = max(1.0, abs(root))
+        real = root.real if abs(root.real) > tolerance * scale else 0.0
+        imag = root.imag if abs(root.imag) > tolerance * scale else 0.0
+        res.append(complex(real, imag))
+    res.sort(key=lambda root: root.real)
+    keys = []
+    start = None
+    for root in res:
+        if start is None or root.real - start > \
+                ORDER_TOLERANCE * max(1.0, abs(start)):
+            start = root.real
+        keys.append((root.imag != 0, start, root.imag))
+    return [root for _, root in sorted(zip(keys, res),
+                                       key=lambda item: item[0])]
@@ -1,8 +1,9 @@
-from typing import Generator, List
+from typing import Callable, Generator, List, Optional
 import collections
 
-from parse_token import Token
-from errors import ValidateError
+from parse_token import Token, TOKEN_NUM, TOKEN_VAR, TOKEN_OP, \
+    TOKEN_PAREN, TOKEN_EQUALS, TOKEN_SPACE
+from errors import ValidateError, CODE_SYMBOL
 
 RIGHT, LEFT = range(2)
 
@@ -55,56 +56,67 @@ class Stack:
 
 class ShuntingYard:
 
-    def __init__(self, tokens: Generator):
+    def __init__(self, tokens: Generator,
+                 emit: Optional[Callable[[Token], None]] = None):
+        # Output tokens go to emit as soon as they are known, in RPN order.
+        # Without emit they are collected and returned by convert().
         self._res: List[Token] = []
+        self._emit = self._res.append if emit is None else emit
+        self._emitted = 0
+        self._operands = 0
+        self._last_unary_plus = False
         self._stack = Stack()
         self._tokens: Generator = tokens
         self._moved_left = False
         self._possible_unary = True
         self._position = 0
         self._previous_token: str = ""
+        self._previous_kind: str = ""
 
     def convert(self) -> List[Token]:
+        self.run()
+        return self._res
+
+    def run(self) -> None:
         for val in self._tokens:
             self.select_action(val)
-            if not val.text.isspace():
+            if val.kind != TOKEN_SPACE:
                 self._previous_token = val.text
+                self._previous_kind = val.kind
         self._handle_eos()
-        self._remove_unary_pluses()
-        self._remove_equality()
-        self._validate_rpn()
-        return self._res
+        if self._operands != 1:
+            raise ValidateError("Уравнение не корректно!")
 
     def select_action(self, val: Token) \
             -> None:
         if val.position >= self._position:
             self._position = val.position
-        if val.text in OPS:
+        kind = val.kind
+        if kind == TOKEN_OP:
             self._handle_operator(val)
-        elif val.text.isspace():
+        elif kind == TOKEN_SPACE:
             pass
-        elif val.isdigit():
+        elif kind == TOKEN_NUM:
             if self._previous_token == ')':
-                self.select_action(Token('*', self._position))
-            self._res.append(val)
+                self.select_action(Token('*', self._position, TOKEN_OP))
+            self._output(val)
             self._possible_unary = False
-        elif val.text in ['x', 'X']:
-            if self.__previous_is_digit() or \
-                    self._previous_token in ['x', 'X'] or \
+        elif kind == TOKEN_VAR:
+            if self._previous_kind in [TOKEN_NUM, TOKEN_VAR] or \
                     self._previous_token == ')':
-                self.select_action(Token('*', self._position))
-            self._res.append(val)
+                self.select_action(Token('*', self._position, TOKEN_OP))
+            self._output(val)
             self._possible_unary = False
-        elif val.text == '(':
+        elif kind == TOKEN_PAREN and val.text == '(':
             self.__increase_stack(val)
             self._possible_unary = True
-        elif val.text == ')':
-            if self._previous_token in OPS:
+        elif kind == TOKEN_PAREN:
+            if self._previous_kind == TOKEN_OP:
                 raise ValidateError("Перед закрывающими скобками стоит "
                                     "знак операции", val)
             self._handle_parentheses(val)
             self._possible_unary = False
-        elif val.text == '=':
+        elif kind == TOKEN_EQUALS:
             if self._moved_left:
                 raise ValidateError("Not more than one quality sign allowed",
                                     val)
@@ -112,7 +124,8 @@ class ShuntingYard:
             self._move_to_left()
             self._possible_unary = True
         else:
-            raise ValidateError(f"Unknown token '{val.text}'", val)
+            raise ValidateError(f"Unknown token '{val.text}'", val,
+                                CODE_SYMBOL)
 
     def _handle_operator(self, op: Token) \
             -> None:
@@ -137,11 +150,12 @@ class ShuntingYard:
     def _handle_eos(self) \
             -> None:
         if self._moved_left:
-            self._handle_parentheses(Token(')', 0))
+            self._handle_parentheses(Token(')', 0, TOKEN_PAREN))
         while not self._stack.is_empty():
-            val = self._stack_to_res()
-            if val.text == '(':
-                raise ValidateError("Brackets not balanced", val)
+            if self._stack.is_bracket():
+                raise ValidateError("Brackets not balanced",
+                                    self._stack.pop())
+            self._stack_to_res()
 
     def __increase_stack(self, val: Token) \
             -> None:
@@ -150,55 +164,31 @@ class ShuntingYard:
     def _stack_to_res(self) \
             -> Token:
         val = self._stack.pop()
-        self._res.append(val)
+        self._output(val)
         return val
 
-    def __previous_is_digit(self):
-        try:
-            float(self._previous_token)
-            return True
-        except ValueError:
-            return False
+    def _output(self, val: Token) -> None:
+        # Checks that every operator has its operands and drops repeated
+        # unary pluses on the way out, so no second pass is needed.
+        if val.kind in [TOKEN_NUM, TOKEN_VAR]:
+            self._operands += 1
+        elif val.text in ['@', '#']:
+            if not self._operands:
+                raise ValidateError("Чего-то тут не хватает", val)
+            if val.text == '#' and self._last_unary_plus:
+                return
+        elif val.kind == TOKEN_OP:
+            if self._operands < 2:
+                raise ValidateError("Чего-то тут не хватает", val)
+            self._operands -= 1
+        self._last_unary_plus = val.text == '#'
+        self._emitted += 1
+        self._emit(val)
 
     def _move_to_left(self) -> None:
-        if not len(self._res):
-            self.select_action(Token('0', 0))
+        if not self._emitted:
+            self.select_action(Token('0', 0, TOKEN_NUM, 0.0))
         self._moved_left = True
         self._possible_unary = False
-        self.select_action(Token('-', self._position))
-        self.select_action(Token('(', self._position + 1))
-
-    def _remove_unary_pluses(self) -> None:
-        plus = False
-        size = len(self._res)
-        for i, elem in enumerate(self._res[::-1]):
-            if elem.text == '#':
-                if plus:
-                    self._res.pop(size - i)
-                plus = True
-            else:
-                plus = False
-
-    def _remove_equality(self):
-        size = len(self._res)
-        for i, val in enumerate(self._res[::-1]):
-            if val.text == '=':
-                self._res.pop(size - i)
-
-    def _validate_rpn(self):
-        counter = 0
-        for elem in self._res:
-            if elem.isdigit() or elem.text in ['x', 'X']:
-                counter += 1
-            elif elem.text in OPS and elem.text not in ['@', '#']:
-                counter -= 2
-                if counter < 0:
-                    raise ValidateError("Чего-то тут не хватает", elem)
-                counter += 1
-            elif elem.text in ['@', '#']:
-                counter -= 1
-                if counter < 0:
-                    raise ValidateError("Чего-то тут не хватает", elem)
-                counter += 1
-        if counter != 1:
-            raise ValidateError("Уравнение не корректно!")
+        self.select_action(Token('-', self._position, TOKEN_OP))
+        self.select_action(Token('(', self._position + 1, TOKEN_PAREN))
@@ -0,0 +1,247 @@
+from typing import Any, Optional, Tuple, Union
+import asyncio
+import collections
+import json
+
+from async_computor import AsyncComputor
+from expression_tree import DEGREE_CAP
+from solve import MAX_DEGREE
+
+CONCURRENCY = 4
+PIPELINE_DEPTH = 64
+LINE_LIMIT = 1 << 20
+# A request may lower these limits, never raise or lift them.
+REQUEST_OPTIONS = {'max_degree': MAX_DEGREE, 'degree_cap': DEGREE_CAP}
+
+Address = Union[str, Tuple[str, int]]
+
+
+def parse_address(address: str) -> Address:
+    # "8000" and "host:8000" are TCP addresses, anything else is the path
+    # of a Unix domain socket.
+    host, _, port = address.rpartition(':')
+    if port.isdigit() and '/' not in address:
+        return host or '127.0.0.1', int(port)
+    return address
+
+
+def _encode(record: dict) -> bytes:
+    return json.dumps(record, ensure_ascii=False).encode('utf-8') + b"\n"
+
+
+class SolverServer:
+
+    def __init__(self, concurrency: int = CONCURRENCY,
+                 pipeline_depth: int = PIPELINE_DEPTH, cache_size: int = 0,
+                 solver_cache_size: int = 0, executor: str = 'thread',
+                 timeout: Optional[float] = None, **options):
+        self._pipeline_depth = pipeline_depth
+        self._limits = {name: options.get(name, default)
+                        for name, default in REQUEST_OPTIONS.items()}
+        self.computor = AsyncComputor(executor, concurrency, concurrency,
+                                      timeout, cache_size, solver_cache_size,
+                                      **options)
+        self.served = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, address: Address) -> asyncio.AbstractServer:
+        if isinstance(address, tuple):
+            self._server = await asyncio.start_server(
+                self.handle_connection, *address, limit=LINE_LIMIT)
+        else:
+            # A socket left by an earlier run is replaced, any other file
+            # at the path is an error.
+            self._server = await asyncio.start_unix_server(
+                self.handle_connection, address, limit=LINE_LIMIT)
+        return self._server
+
+    async def serve_forever(self, address: Address) -> None:
+        server = await self.start(address)
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        self.computor.close(wait=False)
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter) -> None:
+        # Requests are read ahead and solved concurrently, responses are
+        # written back in request order. Once pipeline_depth answers are
+        # pending the reader stops, so a client that does not read its
+        # responses is throttled by the socket buffers.
+        pending: asyncio.Queue = asyncio.Queue(self._pipeline_depth)
+        sender = asyncio.ensure_future(self._send(pending, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    await pending.put(
+                        self._rejected("Слишком длинный запрос."))
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    await pending.put(asyncio.ensure_future(
+                        self._respond(line)))
+        except ConnectionError:
+            pass
+        finally:
+            await pending.put(None)
+            await asyncio.gather(sender, return_exceptions=True)
+            writer.close()
+
+    @staticmethod
+    async def _send(pending: asyncio.Queue,
+                    writer: asyncio.StreamWriter) -> None:
+        # Keeps consuming after the peer is gone, so the reader is never
+        # left waiting on a full queue.
+        connected = True
+        while True:
+            task = await pending.get()
+            if task is None:
+                return
+            response = await task
+            if not connected:
+                continue
+            try:
+                writer.write(response)
+                await writer.drain()
+            except ConnectionError:
+                connected = False
+
+    def _timeout(self, request: dict) -> Optional[float]:
+        # A request may ask for less time than the server allows, not more.
+        timeout = request.get("timeout")
+        if timeout is None:
+            return None
+        if type(timeout) not in (int, float) or not timeout >= 0:
+            raise ValueError("Поле 'timeout' должно быть неотрицательным "
+                             "числом.")
+        if self.computor.timeout is not None:
+            return min(timeout, self.computor.timeout)
+        return timeout
+
+    def _options(self, request: dict) -> dict:
+        options = {}
+        for name, limit in self._limits.items():
+            if name not in request:
+                continue
+            value = request[name]
+            if type(value) is not int or value < 0 or \
+                    limit is not None and value > limit:
+                bound = "" if limit is None else f" до {limit}"
+                raise ValueError(f"Поле '{name}' должно быть целым числом "
+                                 f"от 0{bound}.")
+            options[name] = value
+        return options
+
+    async def _solve(self, equation_src: str, timeout: Optional[float],
+                     options: dict) -> dict:
+        try:
+            return await self.computor.solve_line(equation_src, timeout,
+                                                  **options)
+        except asyncio.TimeoutError:
+            return {"equation": equation_src,
+                    "error": "Время на решение истекло."}
+        except Exception as exc:
+            return {"equation": equation_src, "error": repr(exc)}
+
+    @staticmethod
+    def _rejected(message: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(_encode({"error": message}))
+        return future
+
+    async def _respond(self, line: bytes) -> bytes:
+        try:
+            request = json.loads(line)
+            equation_src = request["equation"]
+            if not isinstance(equation_src, str):
+                raise TypeError
+        except (ValueError, TypeError, KeyError):
+            return _encode({"error": "Ожидается JSON-объект с полем "
+                                     "'equation'."})
+        try:
+            timeout = self._timeout(request)
+            options = self._options(request)
+        except ValueError as exc:
+            record = {"equation": equation_src, "error": str(exc)}
+        else:
+            record = await self._solve(equation_src, timeout, options)
+        self.served += 1
+        if "id" in request:
+            record = dict(id=request["id"], **record)
+        return _encode(record)
+
+
+class Client:
+
+    def __init__(self, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._waiting: collections.deque = collections.deque()
+        self._next_id = 0
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect(cls, address: Address) -> 'Client':
+        if isinstance(address, tuple):
+            streams = await asyncio.open_connection(*address,
+                                                    limit=LINE_LIMIT)
+        else:
+            streams = await asyncio.open_unix_connection(address,
+                                                         limit=LINE_LIMIT)
+        return cls(*streams)
+
+    async def solve(self, equation_src: str, **options) -> dict:
+        # Any number of calls may be in flight on one connection, answers
+        # come back in order and are matched to the oldest waiting call.
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append(future)
+        self._next_id += 1
+        request = dict(id=self._next_id, equation=equation_src, **options)
+        self._writer.write(_encode(request))
+        await self._writer.drain()
+        return await future
+
+    async def _receive(self) -> None:
+        error: Any = ConnectionError("server closed the connection")
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                future = self._waiting.popleft()
+                if not future.done():
+                    future.set_result(json.loads(line))
+        except Exception as exc:
+            error = exc
+        while self._waiting:
+            future = self._waiting.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    async def close(self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
+        await asyncio.gather(self._receiver, return_exceptions=True)
+
+    async def __aenter__(self) -> 'Client':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+def serve(address: str, **options) -> None:
+    server = SolverServer(**options)
+    try:
+        asyncio.run(server.serve_forever(parse_address(address)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
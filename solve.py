@@ -1,155 +1,159 @@
-from typing import List
-
-from expression_tree_node import Node
-from parse_token import Token
+from typing import List, Optional, Tuple
+import math
+
+from polynomial import Polynomial, AnyPolynomial, SPARSE_MIN_SPAN
+from result import Solution
+from cache import LRUCache
+from roots import find_roots, clean_roots
+from numeric import quadratic_roots
+from expression_tree import DEGREE_CAP
 import errors
 
+MAX_DEGREE = 2
+
+
+def canonical_key(poly: AnyPolynomial, normalize: bool = True) -> Tuple:
+    if normalize:
+        poly = poly.monic()
+    return tuple(poly.terms())
+
 
 class SolveEquation:
 
-    def __init__(self, tree: List[Node], quiet: bool):
-        self._terms = tree
-        self.size = len(tree)
-        self._quiet = quiet
-
-    def solve(self) -> str:
-        self._terms = Checker(self._terms).check_all()
-        homer_simpson: float = 0
-        for val in self._terms:
-            if val.power > homer_simpson:
-                homer_simpson = val.power
+    def __init__(self, poly: AnyPolynomial, memo: Optional[LRUCache] = None,
+                 normalize: bool = True,
+                 max_degree: Optional[int] = MAX_DEGREE,
+                 degree_cap: Optional[int] = DEGREE_CAP):
+        self._poly = poly
+        self._memo = memo
+        self._normalize = normalize
+        self._max_degree = max_degree
+        self._degree_cap = degree_cap
+
+    def solve(self) -> Solution:
+        poly = self._poly
+        terms = Checker(poly, self._max_degree).check_all()
+        factored = 0
+        if self._factor(poly):
+            factored, poly = poly.factor_low()
+            terms = poly.terms()
+        degree, lead = terms[0]
+        if degree > MAX_DEGREE and self._degree_cap is not None and \
+                degree > self._degree_cap:
+            # The numeric solver works on all degree + 1 coefficients.
+            raise errors.ValidateError(f"Численно решаются уравнения "
+                                       f"степени не выше {self._degree_cap}.",
+                                       code=errors.CODE_DEGREE)
+        if self._memo is None:
+            solution = self._solve(poly, degree)
+        else:
+            solution = self._solve_memo(poly, degree, lead)
+        if factored:
+            solution = Solution(degree + factored, solution.discriminant,
+                                tuple(clean_roots(list(solution.roots) +
+                                                  [0j])),
+                                factored)
+        return solution
+
+    def _factor(self, poly: AnyPolynomial) -> bool:
+        # Whether X ^ low is taken out only decides how the roots are
+        # found: below SPARSE_MIN_SPAN the numeric solver lists X = 0 low
+        # times over, above it the dense coefficients would not fit.
+        return poly.low >= SPARSE_MIN_SPAN and not poly.is_monomial()
+
+    def _solve_memo(self, poly: AnyPolynomial, degree: int, lead: float) \
+            -> Solution:
+        key = canonical_key(poly, self._normalize)
+        solution = self._memo.get(key)
+        if solution is None:
+            solution = self._solve(poly.monic() if self._normalize else poly,
+                                   degree)
+            self._memo.put(key, solution)
+        if self._normalize and solution.discriminant is not None:
+            # b^2 - 4ac of the monic polynomial is scaled down by a^2.
+            solution = solution._replace(
+                discriminant=solution.discriminant * lead * lead)
+        return solution
+
+    def _solve(self, poly: Polynomial, homer_simpson: int) -> Solution:
         if homer_simpson == 1:
-            return self._first_degree()
+            return self._first_degree(poly)
         elif homer_simpson == 2:
-            return self._second_degree()
-
-    def _first_degree(self) -> str:
-        if not self._quiet:
-            print("Уравнение первой степени. Возможно только одно решение.")
-        if self.size == 1:
-            return "Результат:\n\tX = 0"
-        left = self._terms[0]
-        right = self._terms[1]
-        res = -right.mult / left.mult
-        if not res.is_integer():
-            res = f"{round(res, 2):.2f}"
-        return f"Результат:\n\tX = {res}"
-
-    def _second_degree(self) -> str:
-
-        a = Node(Token('x', 0), 'var')
-        a.power = 1
-        a.mult = 0
-        b = Node(Token('x', 0), 'var')
-        b.power = 1
-        b.mult = 0
-        c = Node(Token('x', 0), 'var')
-        c.power = 0
-        c.mult = 0
-        for val in self._terms:
-            if val.power == 2:
-                a = val
-            elif val.power == 1:
-                b = val
-            else:
-                c = val
-        disc = self.discriminant(a, b, c)
-        if disc < 0:
-            print("Значение дискриминанта меньше 0. Действительных "
-                  "решений нет.")
-            disc = -disc
-            res1 = f"{-b.mult / (2 * a.mult):.2} - " \
-                   f"{round(sqrt(disc) / (2 * a.mult), 2):.2}i"
-            res2 = f"{-b.mult / (2 * a.mult):.2} + " \
-                   f"{round(sqrt(disc) / (2 * a.mult), 2):.2}i"
-            return f"Результат:\n\tX1 = {res1}, X2 = {res2}"
-        if disc == 0:
-            if not self._quiet:
-                print("Дискриминант равен нулю. Доступно одно решение.")
-            res = -b.mult / (2 * a.mult)
-            if not round(res, 2).is_integer():
-                res = f"{round(res, 2):.2f}"
-            else:
-                res = int(res)
-            return f"Результат:\n\tX = {res}"
-        else:
-            if not self._quiet:
-                print("Дискриминант больше нуля. Доступно два решения.")
-            res1 = (-b.mult - sqrt(disc)) / (2 * a.mult)
-            res2 = (-b.mult + sqrt(disc)) / (2 * a.mult)
-            if not round(res1, 2).is_integer():
-                res1 = f"{round(res1, 2):.2f}"
-            else:
-                res1 = int(res1)
-            if not round(res2, 2).is_integer():
-                res2 = f"{round(res2, 2):.2f}"
-            else:
-                res2 = int(res2)
-            return f"Результат:\n\tX1 = {res1}, X2 = {res2}"
+            return self._second_degree(poly)
+        return self._higher_degree(poly, homer_simpson)
 
     @staticmethod
-    def discriminant(a: Node, b: Node, c: Node) -> float:
+    def _first_degree(poly: Polynomial) -> Solution:
+        res = -poly.coefficient(0) / poly.coefficient(1)
+        return Solution(1, None, (complex(res),))
 
-        val = b.mult**2 - 4 * a.mult * c.mult
+    @staticmethod
+    def _second_degree(poly: Polynomial) -> Solution:
+
+        a = poly.coefficient(2)
+        b = poly.coefficient(1)
+        c = poly.coefficient(0)
+        disc, root1, root2 = quadratic_roots(a, b, c)
+        if disc == 0:
+            return Solution(2, disc, (root1,))
+        return Solution(2, disc, (root1, root2))
 
-        return val
+    @staticmethod
+    def _higher_degree(poly: Polynomial, degree: int) -> Solution:
+        coefs = [0.0] * (degree + 1)
+        for power, coef in poly.terms():
+            coefs[power] = coef
+        return Solution(degree, None, tuple(clean_roots(find_roots(coefs))))
 
 
 class Checker:
 
-    def __init__(self, terms: List[Node]):
-        self._terms: List[Node] = terms
+    def __init__(self, poly: Polynomial,
+                 max_degree: Optional[int] = MAX_DEGREE):
+        self._terms: List[Tuple[int, float]] = poly.terms()
+        self._max_degree = max_degree
 
-    def check_all(self) -> List[Node]:
+    def check_all(self) -> List[Tuple[int, float]]:
         self._check_solvability()
         self._check_power()
-        return self._check_zero_mult()
+        return self._terms
 
     def _check_power(self):
-        for elem in self._terms:
-            if elem.power < 0 or elem.power > 2:
-                raise errors.ValidateError("Разрешены степени от 0 до 2 "
-                                           "включительно.")
+        # The limit applies to what is left once X ^ low is taken out,
+        # X ^ low itself only adds X = 0 to the roots.
+        low = max(self._terms[-1][0], 0)
+        for power, _ in self._terms:
+            if power < 0 and self._max_degree is None:
+                raise errors.ValidateError("Разрешены только неотрицательные "
+                                           "степени.",
+                                           code=errors.CODE_DEGREE)
+            if power < 0 or self._max_degree is not None and \
+                    power - low > self._max_degree:
+                raise errors.ValidateError(f"Разрешены степени от 0 до "
+                                           f"{self._max_degree} "
+                                           f"включительно.",
+                                           code=errors.CODE_DEGREE)
 
     def _check_solvability(self):
+        if not all(math.isfinite(coef) for _, coef in self._terms):
+            raise errors.ValidateError("Слишком большое значение.",
+                                       code=errors.CODE_ARITHMETIC)
+        if not self._terms:
+            raise errors.ValidateError("В уравнении вида 0 * X^n = 0 "
+                                       "любое действительное значение"
+                                       " X это решение.",
+                                       code=errors.CODE_DEGENERATE,
+                                       severity=errors.SEVERITY_INFO)
         if len(self._terms) == 1:
-            elem = self._terms[0]
-            if elem.power == 0 and elem.mult != 0:
+            power, _ = self._terms[0]
+            if power == 0:
                 raise errors.ValidateError("Уравнение вида a * X^0 = 0 "
-                                           "решения не имеет.")
-
-            if elem.mult == 0:
-                raise errors.ValidateError("В уравнении вида 0 * X^n = 0 "
-                                           "любое действительное значение"
-                                           " X это решение.")
+                                           "решения не имеет.",
+                                           code=errors.CODE_DEGENERATE,
+                                           severity=errors.SEVERITY_INFO)
 
-            if elem.power > 0:
+            if power > 0:
                 raise errors.ValidateError("Уравнения вида a * X^n = 0 "
-                                           "имеют одно решение:\n\tX = 0.")
-
-    def _check_zero_mult(self):
-        for_remove = []
-        start_size = len(self._terms)
-        for i, val in enumerate(self._terms):
-            if val.mult == 0:
-                for_remove.append(i)
-        for val in for_remove[::-1]:
-            self._terms.pop(val)
-        end_size = len(self._terms)
-        if end_size == 0:
-            raise errors.ValidateError("В уравнении вида 0 * X^n = 0 "
-                                       "любое действительное значение"
-                                       " X это решение.")
-        if start_size > end_size:
-            self._check_solvability()
-        return self._terms
-
-
-def sqrt(val):
-    x = 1
-    while True:
-        nx = (x + val / x) / 2
-        if abs(x - nx) < 1e-10:
-            break
-        x = nx
-    return x
+                                           "имеют одно решение:\n\tX = 0.",
+                                           code=errors.CODE_DEGENERATE,
+                                           severity=errors.SEVERITY_INFO)
@@ -1,7 +1,37 @@
+import asyncio
+import cmath
+import io
+import json
+import os
+import pickle
+import sqlite3
+import subprocess
+import sys
+import time
+
 import pytest
 import rpn
+import computor
 from parse_token import Token
-from computor import evaluate
+import polynomial
+from polynomial import Polynomial, SparsePolynomial
+from expression_tree import ExpressionTree, PolynomialBuilder
+from cache import LRUCache
+from solve import canonical_key
+from errors import ValidateError, ExpressionTreeError
+import roots
+import numeric
+from computor import evaluate, evaluate_batch, create_tokens, run_batch, \
+    collect_diagnostics, compile_equation, evaluate_compiled, \
+    evaluate_system, split_system
+import linear_system
+from bytecode import Bytecode
+from disk_cache import DiskCache
+import disk_cache
+from render import format_answer, render, render_system
+from server import Client, SolverServer, parse_address
+from async_computor import AsyncComputor, async_evaluate
+from profiler import Profile
 
 
 class TestRPN:
@@ -52,14 +82,770 @@ class TestSystem:
         ("5 * x^0 - 4 * x ^ 0 + 7 * x ^ 1", "Результат:\n\tX = -0.14"),
         ("5*x^0 + 13*x^1 + 3*x^2 = 1*x^0 + 1*x^1", "Результат:\n\tX1 = -3.63, X2 = -0.37"),
         ("6*x^0 + 11*x^1 + 5 * x^2 = 1 * x^0 + 1 * X ^ 1", "Результат:\n\tX = -1"),
-        ("11*x^1 - 5 * x^1 = 1 * x^0 + 1 * X ^ 1", "Результат:\n\tX = -0.20"),
-        ("(11*x^4 + 5 * x^3) / x^2 = -6 * x^-1 * x - 1 * X ^ 1", "Результат:\n\tX1 = -1.06, X2 = 0.51"),
+        ("11*x^1 - 5 * x^1 = 1 * x^0 + 1 * X ^ 1", "Результат:\n\tX = 0.20"),
+        ("(11*x^4 + 5 * x^3) / x^2 = -6 * x^-1 * x - 1 * X ^ 1", "Результат:\n\tX1 = -0.27 - 0.69i, X2 = -0.27 + 0.69i"),
+        ("23 = 34*x^1 +45", "Результат:\n\tX = -0.65"),
+        ("5 * X^0 = 4 * X^0 + 7 * X^1", "Результат:\n\tX = 0.14"),
+        ("x*(x+1) = 0", "Результат:\n\tX1 = -1, X2 = 0"),
+        ("(x+1)*(x-1) = 0", "Результат:\n\tX1 = -1, X2 = 1"),
+        ("(x - 2)^2 = 1", "Результат:\n\tX1 = 1, X2 = 3"),
+        ("(x^2 - 1)/(x - 1) = 3", "Результат:\n\tX = 2.0"),
+        ("(x^4 - 1)/(x^2 + 1) = 0", "Результат:\n\tX1 = -1, X2 = 1"),
+        ("(2x - 1)*(x + 3) = x", "Результат:\n\tX1 = -2.58, X2 = 0.58"),
         ("x +2x^2 + 1 = 0", "Результат:\n\tX1 = -0.25 - 0.66i, X2 = -0.25 + 0.66i"),
         ("-x^2 + x = 0", "Результат:\n\tX1 = -1, X2 = 0"),
         ("xx = 5^-3", "Результат:\n\tX1 = -0.09, X2 = 0.09"),
         ("(x^(2 +  5 - 4) 4) /x/x = 5 x ^ 0", "Результат:\n\tX = 1.25")
     ])
     def test_solvability(self, equation, result):
-        res = evaluate(equation)
+        res = format_answer(evaluate(equation))
         assert res == result
 
+    def test_evaluate_returns_structured_result(self):
+        res = evaluate("x^2 = 4")
+        assert res.simplified == Polynomial([-4.0, 0.0, 1.0])
+        assert (res.degree, res.discriminant) == (2, 16.0)
+        assert res.roots == (-2 + 0j, 2 + 0j)
+
+    def test_render(self):
+        res = evaluate("x^2 = 4", keep_rpn=True)
+        assert render(res, quiet=True) == "Результат:\n\tX1 = -2, X2 = 2\n"
+        text = render(res, verbose=True)
+        assert text.startswith("Обратная польская нотация:\n\tx 2 ^ 4 -\n")
+        assert "Упрощенная форма:\n\tX^2-4X^0 = 0\n" in text
+
+
+class TestPolynomial:
+
+    def test_merge_keeps_powers(self):
+        poly = Polynomial([1.0, 2.0], 0) - Polynomial.monomial(3.0, 4)
+        assert poly.terms() == [(4, -3.0), (1, 2.0), (0, 1.0)]
+        assert (poly + Polynomial.monomial(3.0, 4)) == Polynomial([1.0, 2.0])
+
+    @pytest.mark.parametrize("size", [3, 70, 300])
+    def test_product_matches_schoolbook(self, size):
+        left = Polynomial([float(i % 7 - 3) for i in range(size)], 1)
+        right = Polynomial([float(i % 5 - 2) for i in range(size + 9)])
+        product = left * right
+        assert product.low == 1
+        assert product.coefs == polynomial._schoolbook(left.coefs,
+                                                       right.coefs)
+
+    def test_product_keeps_small_coefficients(self):
+        poly = Polynomial([1e-6] + [1.0] * 40)
+        square = poly * poly
+        assert (square.low, square.coefs[0]) == (0, 1e-12)
+        res = evaluate("(x^2+x+1)^64 = 0", max_degree=None)
+        assert (res.degree, res.factored) == (128, 0)
+
+    @pytest.mark.parametrize("base", [
+        Polynomial([1.0, 1.0]), Polynomial([2.0, 0.0, -1.0], 1),
+        Polynomial([1.0, -2.0, 3.0])])
+    def test_power_by_squaring(self, base):
+        expected = Polynomial.constant(1.0)
+        for _ in range(13):
+            expected = expected * base
+        res = base ** 13
+        assert res.low == expected.low
+        assert all(abs(a - b) <= 1e-12 * abs(b)
+                   for a, b in zip(res.coefs, expected.coefs))
+
+    def test_power_degree_cap(self):
+        tree = ExpressionTree(rpn.ShuntingYard(
+            create_tokens("(x+1)^200 = 0")).convert(), degree_cap=100)
+        tree.create()
+        with pytest.raises(ExpressionTreeError):
+            tree.evaluate()
+
+    @pytest.mark.parametrize("equation,terms", [
+        ("(x^1000000 - 1)^2 = 0",
+         [(2000000, 1.0), (1000000, -2.0), (0, 1.0)]),
+        ("(x^1000000 - 1)^200 = 0", None),
+    ])
+    def test_sparse_power_cap_counts_terms(self, equation, terms):
+        tree = ExpressionTree(rpn.ShuntingYard(
+            create_tokens(equation)).convert(), degree_cap=100)
+        tree.create()
+        if terms is None:
+            with pytest.raises(ExpressionTreeError):
+                tree.evaluate()
+        else:
+            assert tree.evaluate().terms() == terms
+
+    @pytest.mark.parametrize("dividend,divisor", [
+        (Polynomial([-1.0, 0.0, 0.0, 1.0]), Polynomial([-1.0, 1.0])),
+        (Polynomial([5.0, -3.0, 0.0, 2.0, 7.0], 1),
+         Polynomial([1.0, 0.0, 2.0])),
+        (Polynomial([2.0, 1.0]), Polynomial([1.0, 4.0, 1.0], 1)),
+    ])
+    def test_division_identity(self, dividend, divisor):
+        quotient, remainder = dividend.divide(divisor)
+        restored = quotient * divisor + remainder
+        assert restored.low == dividend.low
+        assert all(abs(a - b) < 1e-12
+                   for a, b in zip(restored.coefs, dividend.coefs))
+
+    def test_division_with_remainder(self):
+        with pytest.raises(ExpressionTreeError):
+            evaluate("x^2/(x + 1) = 0")
+
+    def test_long_sum(self):
+        equation = " + ".join(f"{i} * x^{i % 3}" for i in range(400))
+        rpn_ = rpn.ShuntingYard(create_tokens(equation)).convert()
+        tree = ExpressionTree(rpn_)
+        tree.create()
+        assert tree.evaluate().terms() == [(2, 26600.0), (1, 26467.0),
+                                           (0, 26733.0)]
+
+    def test_deep_nesting_without_recursion(self):
+        depth = sys.getrecursionlimit() * 3
+        equation = "(x+" * depth + "1" + ")" * depth
+        rpn_ = rpn.ShuntingYard(create_tokens(equation)).convert()
+        tree = ExpressionTree(rpn_)
+        tree.create()
+        assert tree.evaluate() == Polynomial([1.0, float(depth)])
+
+    @pytest.mark.parametrize("equation", [
+        "(x+" * 3000 + "1" + ")" * 3000,
+        "+ + x - - 2 * x ^ 2 = +x",
+        "x^2 - 3x / (2 ^ -1) = (x + 1) ^ 3 / (x + 1)",
+    ])
+    def test_fused_matches_tree(self, equation):
+        tree = ExpressionTree(
+            rpn.ShuntingYard(create_tokens(equation)).convert())
+        tree.create()
+        builder = PolynomialBuilder(keep_rpn=True)
+        rpn.ShuntingYard(create_tokens(equation), builder.push).run()
+        assert builder.result() == tree.evaluate()
+        assert builder.rpn == [str(tok) for tok in rpn.ShuntingYard(
+            create_tokens(equation)).convert()]
+
+    def test_fused_rejects_mixed_unary(self):
+        builder = PolynomialBuilder()
+        with pytest.raises(ExpressionTreeError):
+            rpn.ShuntingYard(create_tokens("+-x = 1"), builder.push).run()
+
+    def test_compile_horner(self):
+        poly = Polynomial([1.0, -3.0, 0.0, 2.0], -1)
+        value = poly.compile()
+        value_and_slope = poly.compile(derivative=True)
+        for x in [0.5, -2.0, 3.0]:
+            exact = 1 / x - 3 + 2 * x * x
+            assert value(x) == pytest.approx(exact)
+            assert value_and_slope(x) == pytest.approx(
+                (exact, -1 / x ** 2 + 4 * x))
+        assert value(1j) == pytest.approx(-1j - 3 - 2)
+
+    def test_compile_on_array(self):
+        np = pytest.importorskip("numpy")
+        poly = evaluate("x^2 - 3x = -2").simplified
+        grid = np.arange(-5, 6)
+        values, slopes = poly.compile(derivative=True)(grid)
+        assert values.tolist() == [x * x - 3 * x + 2 for x in range(-5, 6)]
+        assert slopes.tolist() == [2 * x - 3 for x in range(-5, 6)]
+
+    def test_sparse_chosen_for_huge_exponents(self):
+        x = Polynomial.monomial(1.0, 1)
+        poly = x ** 1000000 - Polynomial.constant(1.0)
+        assert isinstance(poly, SparsePolynomial)
+        assert poly.powers == [0, 1000000] and poly.coefs == [-1.0, 1.0]
+        assert poly - x ** 1000000 == Polynomial([-1.0])
+        squared = (x ** 100 + Polynomial.constant(1.0)) ** 2
+        assert squared.terms() == [(200, 1.0), (100, 2.0), (0, 1.0)]
+        dense = Polynomial([1.0] + [0.0] * 99 + [1.0]) ** 2
+        assert squared == dense and hash(squared) == hash(dense)
+        assert (squared * x).divide(x ** 101) == \
+            (x ** 100 + Polynomial([2.0]) + Polynomial([1.0], -100),
+             Polynomial([]))
+
+    def test_sparse_by_dense_division(self):
+        x = Polynomial.monomial(1.0, 1)
+        one = Polynomial.constant(1.0)
+        quotient, remainder = (x ** 100 - one).divide(x - one)
+        assert quotient == Polynomial([1.0] * 100) and remainder.is_zero()
+        res = evaluate("(x^100 - 1)/(x - 1) = 0", max_degree=None)
+        assert res.degree == 99
+
+    def test_sparse_compile(self):
+        poly = (Polynomial.monomial(1.0, 80) -
+                Polynomial.monomial(3.0, 1)) * Polynomial.monomial(1.0, 2)
+        value_and_slope = poly.compile(derivative=True)
+        for x in [1.01, -0.9]:
+            assert value_and_slope(x) == pytest.approx(
+                (x ** 82 - 3 * x ** 3, 82 * x ** 81 - 9 * x ** 2))
+
+    @pytest.mark.parametrize("equation,result,factored", [
+        ("x^1000000 - x^999999 = 0", "Результат:\n\tX1 = 0, X2 = 1",
+         999999),
+        ("x^102 + 3x^100 = 0",
+         "Результат:\n\tX1 = 0, X2 = 0 - 1.73i, X3 = 0 + 1.73i", 100),
+    ])
+    def test_lowest_power_factored_out(self, equation, result, factored):
+        res = evaluate(equation)
+        assert format_answer(res) == result
+        assert res.factored == factored
+        assert disk_cache.decode_result(disk_cache.encode_result(res)) == res
+
+    def test_factored_notes(self):
+        text = render(evaluate("x^102 + 3x^100 = 0"))
+        assert "Вынесен множитель X^100, X = 0 - корень.\n" \
+               "Дискриминант оставшегося квадратного уравнения меньше 0. " \
+               "Других действительных решений нет." in text
+
+    @pytest.mark.parametrize("equation,result", [
+        ("x^3 = x^2", "Результат:\n\tX1 = 0, X2 = 0, X3 = 1"),
+        ("x^4 - x^2 = 0", "Результат:\n\tX1 = -1, X2 = 0, X3 = 0, X4 = 1"),
+    ])
+    def test_degree_limit_skips_low_powers(self, equation, result):
+        assert format_answer(evaluate(equation)) == result
+
+    @pytest.mark.parametrize("equation", ["x^5 + x^2 = 0",
+                                          "x^1000003 + x^1000000 = 0"])
+    def test_degree_limit_after_low_powers(self, equation):
+        with pytest.raises(ValidateError):
+            evaluate(equation)
+
+
+class TestRoots:
+
+    @pytest.mark.parametrize("equation,result", [
+        ("x^3 - 6x^2 + 11x = 6", "Результат:\n\tX1 = 1, X2 = 2, X3 = 3"),
+        ("x^3 = 1",
+         "Результат:\n\tX1 = 1, X2 = -0.50 - 0.87i, X3 = -0.50 + 0.87i"),
+        ("x^4 = x^2", "Результат:\n\tX1 = -1, X2 = 0, X3 = 0, X4 = 1"),
+    ])
+    def test_any_degree(self, equation, result):
+        assert format_answer(evaluate(equation, max_degree=None)) == result
+
+    def test_degree_limit(self):
+        with pytest.raises(ValidateError):
+            evaluate("x^3 = 1")
+
+    @pytest.mark.parametrize("equation,degree_cap", [
+        ("x^1000000 + x^3 - 1 = 0", 10000), ("x^20 = 1", 10),
+    ])
+    def test_numeric_degree_capped(self, equation, degree_cap):
+        with pytest.raises(ValidateError) as info:
+            evaluate(equation, max_degree=None, degree_cap=degree_cap)
+        assert info.value.code == "degree"
+
+    @pytest.mark.parametrize("equation", [
+        "(x^2+x+1)^700 = 0",
+        f"(1{'0' * 200} * x + 1) * (1{'0' * 200} * x - 1) = 0",
+        f"1{'0' * 400} * x = 1",
+    ])
+    def test_overflow_is_reported(self, equation):
+        with pytest.raises((ExpressionTreeError, ValidateError)):
+            evaluate(equation, max_degree=None, degree_cap=None)
+        if "^" not in equation:
+            with pytest.raises((ExpressionTreeError, ValidateError)):
+                compile_equation(equation).run()
+        with pytest.raises(ValueError):
+            roots.find_roots([1.0, float('inf'), 1.0])
+
+    @pytest.mark.parametrize("backend", ["aberth", "auto"])
+    def test_multiple_roots_keep_order(self, backend):
+        coefs = [1.0, 0.0, 2.0, 0.0, 1.0]
+        found = roots.clean_roots(roots.find_roots(coefs, backend))
+        assert [root.imag > 0 for root in found] == [False, False,
+                                                     True, True]
+
+    def test_aberth_residual(self):
+        coefs = [float(i % 5 - 2) for i in range(41)]
+        for root in roots.find_roots(coefs, 'aberth'):
+            value = sum(coef * root ** i for i, coef in enumerate(coefs))
+            assert abs(value) < 1e-8 * max(1.0, abs(root)) ** 40
+
+
+class TestSolveMany:
+
+    def test_matches_solver_cases(self):
+        np = pytest.importorskip("numpy")
+        from vectorized import solve_many, INFINITE
+        a = np.array([1.0, 1.0, 1.0, 0.0, 0.0, 0.0, -1.0])
+        b = np.array([0.0, 2.0, 0.0, 2.0, 0.0, 0.0, 1.0])
+        c = np.array([-4.0, 1.0, 4.0, -4.0, 3.0, 0.0, 0.0])
+        res = solve_many(a, b, c)
+        assert res['count'].tolist() == [2, 1, 2, 1, 0, INFINITE, 2]
+        assert res['real'][0].tolist() == [-2.0, 2.0]
+        assert res['real'][1].tolist() == [-1.0, -1.0]
+        assert res['real'][2].tolist() == [0.0, 0.0]
+        assert res['imag'][2].tolist() == [-2.0, 2.0]
+        assert res['real'][3, 0] == 2.0
+        assert res['real'][6].tolist() == [1.0, 0.0]
+
+    def test_broadcast_scalars(self):
+        pytest.importorskip("numpy")
+        from vectorized import solve_many
+        res = solve_many(1.0, [-3.0, 0.0], 2.0)
+        assert res.shape == (2,)
+        assert res['real'][0].tolist() == [1.0, 2.0]
+
+    @pytest.mark.filterwarnings("error")
+    def test_huge_coefficients_match_solver(self):
+        pytest.importorskip("numpy")
+        from vectorized import solve_many
+        triples = [(1.0, 1e200, 1.0), (1e-300, 1.0, -1e300),
+                   (1e200, 1.0, 1e200), (1e300, -1e300, -1e300)]
+        res = solve_many(*zip(*triples))
+        for row, triple in zip(res, triples):
+            _, root1, root2 = numeric.quadratic_roots(*triple)
+            assert row['count'] == 2
+            assert row['real'].tolist() == [root1.real, root2.real]
+            assert row['imag'].tolist() == [root1.imag, root2.imag]
+
+
+class TestNumeric:
+
+    @pytest.mark.parametrize("val", [3e-300, 2.0, 1e200, 1.7e308])
+    def test_sqrt_relative(self, val):
+        root, iterations = numeric.newton_sqrt(val)
+        assert abs(root * root - val) <= 1e-15 * val
+        assert iterations <= 6
+
+    def test_quadratic_without_cancellation(self):
+        disc, root1, root2 = numeric.quadratic_roots(1.0, 1e8, 1.0)
+        assert abs(root2.real + 1e-8) < 1e-20
+        assert abs(root1.real + 1e8) < 1e-7
+
+    def test_quadratic_huge_coefficient(self):
+        disc, root1, root2 = numeric.quadratic_roots(1.0, 1e200, 1.0)
+        assert disc > 0
+        assert root1 == -1e200 and root2.real == pytest.approx(-1e-200)
+        disc, root1, root2 = numeric.quadratic_roots(1e200, 1.0, 1e200)
+        assert disc < 0 and root1 == pytest.approx(-1j)
+        res = evaluate(f"x^2 + 1{'0' * 160} x + 1 = 0")
+        assert all(map(cmath.isfinite, res.roots))
+
+
+class TestTokens:
+
+    def test_kinds_and_values(self):
+        tokens = list(create_tokens("3.5x^2 = (x)"))
+        assert [tok.kind for tok in tokens] == [
+            'num', 'var', 'op', 'num', 'space', 'eq', 'space',
+            'paren', 'var', 'paren']
+        assert tokens[0].value == 3.5 and tokens[3].value == 2.0
+
+    def test_malformed_number(self):
+        assert next(create_tokens("1.2.3")).kind == 'unknown'
+
+
+class TestCache:
+
+    def test_hits_on_normalized_tokens(self):
+        cache = LRUCache(maxsize=2)
+        first = evaluate("x^2 = 4", cache=cache)
+        assert evaluate("X ^ 2=4", cache=cache) is first
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_eviction(self):
+        cache = LRUCache(maxsize=2)
+        for equation in ["x = 1", "x = 2", "x = 3", "x = 1"]:
+            evaluate(equation, cache=cache)
+        assert len(cache) == 2
+        assert cache.stats()["evictions"] == 2
+        assert cache.hits == 0
+
+    def test_solver_memo_on_canonical_terms(self):
+        memo = LRUCache()
+        results = [format_answer(evaluate(equation, solver_cache=memo))
+                   for equation in ["2*x = 4", "x - 2 = 0", "4 = 2 * x"]]
+        assert results == ["Результат:\n\tX = 2.0"] * 3
+        assert (memo.hits, memo.misses) == (2, 1)
+        assert canonical_key(Polynomial([-4.0, 2.0])) == ((1, 1.0), (0, -2.0))
+
+
+class TestBatch:
+
+    def test_batch_continues_after_error(self):
+        lines = ["x^2 = 4\n", "\n", "5 = 5\n", "(3\n", "x = 2"]
+        records = list(evaluate_batch(lines))
+        assert [rec["line"] for rec in records] == [1, 3, 4, 5]
+        assert records[0]["result"] == "Результат:\n\tX1 = -2, X2 = 2"
+        assert "error" in records[1] and "error" in records[2]
+        assert records[3]["result"] == "Результат:\n\tX = 2.0"
+
+    def test_unexpected_error_fails_one_line(self, monkeypatch):
+        def broken(*args, **kwargs):
+            raise RuntimeError("database is locked")
+
+        monkeypatch.setattr(computor, "evaluate", broken)
+        records = list(evaluate_batch(["x = 1", "x = 2"]))
+        assert [rec["error"] for rec in records] == \
+            ["Внутренняя ошибка: RuntimeError: database is locked"] * 2
+        assert records[0]["diagnostic"]["code"] == "internal"
+
+    def test_unexpected_error_in_single_equation(self, monkeypatch):
+        def broken(*args, **kwargs):
+            raise RuntimeError("database is locked")
+
+        out = io.StringIO()
+        monkeypatch.setattr(computor, "evaluate", broken)
+        monkeypatch.setattr(computor, "write",
+                            lambda text, *args: out.write(text))
+        monkeypatch.setattr(sys, "argv", ["computor.py", "-q", "x = 1"])
+        computor.computor()
+        assert out.getvalue() == \
+            "Внутренняя ошибка: RuntimeError: database is locked\n"
+
+    def test_parallel_keeps_order(self):
+        lines = [f"x = {i}" for i in range(50)] + ["(3"]
+        serial = list(evaluate_batch(lines))
+        parallel = list(evaluate_batch(lines, workers=2, chunk_size=7))
+        assert parallel == serial
+        cached = list(evaluate_batch(lines * 2, workers=2, cache_size=16))
+        assert cached[:len(lines)] == serial
+
+    def test_serial_batch_keeps_worker_globals(self):
+        list(evaluate_batch(["x = 1"], cache_size=4, solver_cache_size=4))
+        assert computor._worker_cache is None
+        assert computor._worker_solver_cache is None
+
+    def test_cache_stats_need_one_worker(self, tmp_path, capsys):
+        path = tmp_path / "lines.txt"
+        path.write_text("x = 1\nx = 1\n")
+        run_batch(str(path), io.StringIO(), cache_size=4, stats=True)
+        assert json.loads(capsys.readouterr().err)["cache"]["hits"] == 1
+        with pytest.raises(ValueError):
+            run_batch(str(path), io.StringIO(), workers=2, stats=True)
+        with pytest.raises(ValueError):
+            run_batch(str(path), io.StringIO(), workers=2, profile=True)
+
+    def test_single_equation_skips_heavy_imports(self):
+        code = ("import sys, computor\n"
+                "computor.evaluate('x^2 + (x + 1)^2 = 5')\n"
+                "print(sorted({'numpy', 'multiprocessing'} &"
+                " set(sys.modules)))")
+        out = subprocess.run([sys.executable, "-c", code],
+                             cwd=os.path.dirname(computor.__file__),
+                             capture_output=True, text=True, check=True)
+        assert out.stdout == "[]\n"
+
+
+class TestDiagnostics:
+
+    def test_no_output_until_formatted(self, capsys):
+        with pytest.raises(ValidateError) as info:
+            evaluate("x^2 + (3 = 0")
+        assert capsys.readouterr().out == ""
+        exc = info.value
+        assert (exc.code, exc.severity, exc.position) == ("syntax", "error", 6)
+        assert exc.format() == "      ^ Brackets not balanced"
+        restored = pickle.loads(pickle.dumps(exc))
+        assert restored.record() == exc.record()
+
+    def test_collect_from_batch(self):
+        lines = ["x = 1", "x = x", "1 / 0 = x", "x ? 2"]
+        diagnostics = list(collect_diagnostics(evaluate_batch(lines)))
+        assert [(d["line"], d["code"], d["severity"], d["position"])
+                for d in diagnostics] == [(2, "degenerate", "info", None),
+                                          (3, "arithmetic", "error", 2),
+                                          (4, "symbol", "error", 2)]
+
+
+class TestServer:
+
+    def test_parse_address(self):
+        assert parse_address("8000") == ("127.0.0.1", 8000)
+        assert parse_address("localhost:9") == ("localhost", 9)
+        assert parse_address("/tmp/computor.sock") == "/tmp/computor.sock"
+
+    def test_pipelined_requests_answered_in_order(self, tmp_path):
+        address = str(tmp_path / "computor.sock")
+
+        async def scenario():
+            server = SolverServer(concurrency=2, pipeline_depth=4,
+                                  cache_size=8)
+            await server.start(address)
+            try:
+                async with await Client.connect(address) as client:
+                    equations = [f"x = {i}" for i in range(20)] + ["(3"]
+                    return await asyncio.gather(
+                        *(client.solve(equation) for equation in equations))
+            finally:
+                server.close()
+
+        records = asyncio.run(scenario())
+        assert [rec["id"] for rec in records] == list(range(1, 22))
+        assert records[5]["roots"] == [[5.0, 0.0]]
+        assert records[-1]["diagnostic"]["code"] == "syntax"
+
+    def test_requests_only_tighten_limits(self, tmp_path):
+        address = str(tmp_path / "computor.sock")
+
+        async def scenario():
+            server = SolverServer(concurrency=2, max_degree=None,
+                                  degree_cap=100)
+            await server.start(address)
+            try:
+                async with await Client.connect(address) as client:
+                    return await asyncio.gather(*(
+                        client.solve("(x+1)^50 = 0", **options)
+                        for options in [{"degree_cap": None},
+                                        {"degree_cap": 1000},
+                                        {"degree_cap": True},
+                                        {"max_degree": -1},
+                                        {"degree_cap": 10},
+                                        {"max_degree": 2}]))
+            finally:
+                server.close()
+
+        records = asyncio.run(scenario())
+        assert all("diagnostic" not in rec for rec in records[:4])
+        assert all(rec["error"].startswith("Поле") for rec in records[:4])
+        assert [rec["diagnostic"]["code"] for rec in records[4:]] == [
+            "power", "degree"]
+
+    def test_request_timeout_capped(self, tmp_path):
+        address = str(tmp_path / "computor.sock")
+
+        async def scenario():
+            server = SolverServer(timeout=0)
+            await server.start(address)
+            try:
+                async with await Client.connect(address) as client:
+                    return await asyncio.gather(*(
+                        client.solve("x = 1", timeout=timeout)
+                        for timeout in [1e9, True, -1]))
+            finally:
+                server.close()
+
+        capped, flag, negative = asyncio.run(scenario())
+        assert capped["error"] == "Время на решение истекло."
+        assert flag["error"] == negative["error"] == \
+            "Поле 'timeout' должно быть неотрицательным числом."
+
+    def test_keeps_files_at_socket_path(self, tmp_path):
+        path = tmp_path / "computor.sock"
+        path.write_text("data")
+        server = SolverServer()
+        try:
+            with pytest.raises(OSError):
+                asyncio.run(server.start(str(path)))
+        finally:
+            server.close()
+        assert path.read_text() == "data"
+
+
+class TestAsync:
+
+    equations = ["x^2 - 3x = -2", "(x + 1)^3 = x^3 + 1",
+                 "x^1000000 = x^999999"]
+
+    @pytest.mark.parametrize("executor", ["thread", "process"])
+    def test_same_results_as_evaluate(self, executor):
+        async def scenario():
+            async with AsyncComputor(executor, workers=2, cache_size=4,
+                                     max_degree=None) as pool:
+                results = await asyncio.gather(
+                    *(pool.evaluate(eq) for eq in self.equations * 2))
+                with pytest.raises(ValidateError) as info:
+                    await pool.evaluate("x^3 = 1", max_degree=2)
+                return results, info.value
+
+        results, error = asyncio.run(scenario())
+        assert results == [evaluate(eq, max_degree=None)
+                           for eq in self.equations * 2]
+        assert error.code == "degree"
+        assert asyncio.run(async_evaluate("x = 2")) == evaluate("x = 2")
+
+    def test_in_flight_limit_timeout_and_cancel(self):
+        running = []
+        peak = []
+
+        def slow(seconds):
+            # The profile hook runs in the worker after each equation.
+            def hook(profile):
+                running.append(profile)
+                peak.append(len(running))
+                time.sleep(seconds)
+                running.remove(profile)
+            return Profile(hook)
+
+        async def scenario():
+            async with AsyncComputor(workers=4, max_in_flight=2) as pool:
+                with pytest.raises(asyncio.TimeoutError):
+                    await pool.evaluate("x = 0", timeout=0.01,
+                                        profile=slow(0.2))
+                queued = asyncio.ensure_future(
+                    pool.evaluate("x = 9", profile=slow(0.05)))
+                await asyncio.sleep(0)
+                queued.cancel()
+                done = await asyncio.gather(
+                    *(pool.evaluate(f"x = {i}", profile=slow(0.01 * i))
+                      for i in range(1, 6)),
+                    queued, return_exceptions=True)
+            return done
+
+        done = asyncio.run(scenario())
+        assert [res.roots for res in done[:5]] == [(i + 0j,)
+                                                   for i in range(1, 6)]
+        assert isinstance(done[5], asyncio.CancelledError)
+        assert max(peak) == 2
+
+
+class TestProfile:
+
+    def test_counts_and_hook(self):
+        seen = []
+        profile = Profile(seen.append)
+        cache = LRUCache()
+        for equation in ["(x + 1) ^ 2 = x * 3", "(X+1)^2=x*3", "-x = 2"]:
+            evaluate(equation, cache=cache, profile=profile)
+        report = profile.report()
+        assert seen == [profile] * 3 and report["equations"] == 3
+        assert report["counters"]["cache_hits"] == 1
+        assert report["counters"]["nodes_unary"] == 1
+        assert report["operations"] == {"power": 1, "addition": 1,
+                                        "multiplication": 1,
+                                        "subtraction": 2}
+        assert report["max_depth"] == 4
+        assert all(seconds >= 0 for seconds in report["stages"].values())
+
+    def test_hook_runs_on_error(self):
+        profile = Profile()
+        with pytest.raises(ValidateError):
+            evaluate("x + (1 = 0", profile=profile)
+        assert profile.equations == 1
+        assert profile.stages["solve"] == 0.0
+
+
+class TestBytecode:
+
+    @pytest.mark.parametrize("equation", [
+        "5 * X^0 + 4 * X^1 - 9.3 * X^2 = 1 * X^0",
+        "-(x - 2) ^ 2 + + 4x = (x^3 - 1) / (x - 1)",
+        "(x+" * 2000 + "1" + ")" * 2000 + " = 3x",
+    ])
+    def test_round_trip_matches_evaluate(self, equation):
+        bytecode = compile_equation(equation)
+        restored = Bytecode.from_bytes(bytecode.to_bytes())
+        assert restored == bytecode
+        assert restored.run() == evaluate(equation, max_degree=None).simplified
+
+    def test_compact_pool(self):
+        bytecode = compile_equation("2x + 2x^2 = 2")
+        assert list(bytecode.pool) == [2.0]
+        assert len(bytecode.to_bytes()) == 12 + 8 * len(bytecode) + 8
+        assert evaluate_compiled(bytecode).roots == \
+            evaluate("2x + 2x^2 = 2").roots
+
+    def test_errors_keep_position(self):
+        with pytest.raises(ExpressionTreeError) as info:
+            compile_equation("x^2 / (x + 1) = 0").run()
+        assert info.value.position == 4
+        with pytest.raises(ValueError):
+            Bytecode.from_bytes(b"CPB1" + bytes(9))
+
+    def test_rejects_mixed_unary(self):
+        with pytest.raises(ExpressionTreeError) as info:
+            compile_equation("2 * +-x = 1")
+        assert info.value.position == 4
+
+
+class TestDiskCache:
+
+    def test_survives_reopen(self, tmp_path):
+        path = str(tmp_path / "cache" / "results.sqlite3")
+        cache = DiskCache(path)
+        first = evaluate("x^2 - 3x = -2", cache=cache)
+        cache.close()
+        cache = DiskCache(path)
+        assert evaluate("X ^ 2 - 3 X = -2", cache=cache) == first
+        assert (cache.hits, cache.misses) == (1, 0)
+        assert cache.stats()["total"] == {"hits": 1, "misses": 1,
+                                          "evictions": 0}
+
+    def test_size_and_age_limits(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(disk_cache, "PRUNE_EVERY", 1)
+        cache = DiskCache(str(tmp_path / "results.sqlite3"), maxsize=3)
+        for i in range(1, 7):
+            evaluate(f"x = {i}", cache=cache)
+        evaluate("x = 6", cache=cache)
+        assert len(cache) == 3 and cache.evictions == 3
+        cache.max_age = 0.0
+        evaluate("x = 6", cache=cache)
+        assert cache.hits == 1 and cache.evictions == 6 and len(cache) == 1
+
+    def test_lookups_do_not_wait_for_writers(self, tmp_path):
+        path = str(tmp_path / "results.sqlite3")
+        cache = DiskCache(path, timeout=0.1)
+        first = evaluate("x = 1", cache=cache)
+        writer = sqlite3.connect(path, isolation_level=None)
+        writer.execute("BEGIN IMMEDIATE")
+        try:
+            assert evaluate("x = 1", cache=cache) == first
+        finally:
+            writer.execute("ROLLBACK")
+            writer.close()
+        assert cache.stats()["total"] == {"hits": 1, "misses": 1,
+                                          "evictions": 0}
+
+    def test_shared_by_batch_workers(self, tmp_path):
+        options = {"path": str(tmp_path / "results.sqlite3")}
+        lines = [f"x^2 = {i % 10 + 1}" for i in range(60)]
+        serial = list(evaluate_batch(lines))
+        assert list(evaluate_batch(lines, workers=2, chunk_size=5,
+                                   disk_cache=options)) == serial
+        cache = DiskCache(**options)
+        assert len(cache) == 10
+        assert list(evaluate_batch(lines, disk_cache=options)) == serial
+
+
+class TestLinearSystem:
+
+    equations = ["2x + 3y - z = 1", "x - y + 2z = 3", "3x + y + z = 6"]
+
+    @pytest.mark.parametrize("backend", ["auto", "gauss", "sparse", "dense"])
+    def test_backends_agree(self, backend):
+        if backend == "dense":
+            pytest.importorskip("numpy")
+        res = evaluate_system(self.equations, backend)
+        assert res.names == ("x", "y", "z")
+        assert [round(val, 9) for val in res.values] == [3, -2, -1]
+        assert res.rank == 3 and res.consistent
+
+    def test_render(self):
+        res = evaluate_system(split_system("a + b = 3; 2 * (a - b) = 2"))
+        assert render_system(res, quiet=True) == \
+            "Результат:\n\ta = 2\n\tb = 1\n"
+        assert "единственное" in render_system(res)
+        assert evaluate_system(["a + b = 1", "2a + 2b = 2"]).rank == 1
+        assert not evaluate_system(["a + b = 1", "a + b = 2"]).consistent
+
+    @pytest.mark.parametrize("backend", ["auto", "gauss", "sparse", "dense"])
+    def test_underdetermined_same_on_every_backend(self, backend):
+        if backend == "dense":
+            pytest.importorskip("numpy")
+        res = evaluate_system(["a + b = 2", "2a + 2b = 4"], backend)
+        assert (res.values, res.rank, res.free) == ((2.0, 0.0), 1, ("b",))
+        assert render_system(res, quiet=True) == \
+            "Результат:\n\ta = 2 - b\n\tb - любое число\n"
+        res = evaluate_system(["a + b + c = 2", "a - c = 1"], backend)
+        assert res.depends == ((("c", 1.0),), (("c", -2.0),), ())
+
+    @pytest.mark.parametrize("equation, position", [
+        ("a * b = 1", 2), ("a / b = 1", 2), ("a ^ 2 = 1", 2), ("1 / 0 = a", 2),
+        ("2 * +-a = 1", 4),
+    ])
+    def test_not_linear(self, equation, position):
+        with pytest.raises(ExpressionTreeError) as info:
+            evaluate_system([equation, "a = 1"])
+        assert info.value.position == position
+
+    def test_sparse_grid(self):
+        # Poisson's equation on a 30 x 30 grid, five unknowns per equation.
+        side = 30
+        equations = []
+        for row in range(side):
+            for col in range(side):
+                near = [f"- u{r}_{c}" for r, c in
+                        ((row - 1, col), (row + 1, col), (row, col - 1),
+                         (row, col + 1)) if 0 <= r < side and 0 <= c < side]
+                equations.append(f"4u{row}_{col} {' '.join(near)} = 1")
+        res = evaluate_system(equations[::-1], "gauss")
+        assert res.rank == side * side and res.residual < 1e-9
+        size = linear_system.SPARSE_MIN_SIZE
+        assert linear_system.choose_backend(
+            [{i: 1.0} for i in range(size)], size) == "sparse"
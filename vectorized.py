@@ -0,0 +1,76 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+INFINITE = -1
+
+if np is not None:
+    SOLUTION_DTYPE = np.dtype([('count', np.int8),
+                               ('real', np.float64, (2,)),
+                               ('imag', np.float64, (2,))])
+
+
+def solve_many(a, b, c):
+    # Solves a * X^2 + b * X + c = 0 for every triple at once. count is
+    # 0 (no solution), 1, 2 or INFINITE (0 = 0). X1 is (-b - sqrt(D)) / 2a
+    # and X2 is (-b + sqrt(D)) / 2a, as in SolveEquation.
+    if np is None:
+        raise ImportError("solve_many requires numpy")
+    a, b, c = np.broadcast_arrays(np.asarray(a, dtype=np.float64),
+                                  np.asarray(b, dtype=np.float64),
+                                  np.asarray(c, dtype=np.float64))
+    shape = a.shape
+    a, b, c = a.ravel(), b.ravel(), c.ravel()
+    res = np.zeros(a.shape, dtype=SOLUTION_DTYPE)
+    real = res['real']
+    imag = res['imag']
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        quadratic = a != 0
+        linear = ~quadratic & (b != 0)
+        constant = ~quadratic & (b == 0)
+        res['count'][constant & (c == 0)] = INFINITE
+
+        root = -c / b
+        real[linear] = root[linear, None]
+        res['count'][linear] = 1
+
+        disc = b * b - 4 * a * c
+        sq = np.sqrt(np.abs(disc))
+        # Where b^2 or 4ac overflowed, D / m^2 with m = max(|b|, 2 sqrt|ac|)
+        # is formed from ratios up to 1 instead, as in quadratic_roots().
+        huge = ~np.isfinite(disc)
+        if huge.any():
+            s = 2 * np.sqrt(np.abs(a[huge])) * np.sqrt(np.abs(c[huge]))
+            m = np.maximum(np.abs(b[huge]), s)
+            ac = (s / m) ** 2
+            ac = np.where((a[huge] > 0) == (c[huge] > 0), ac, -ac)
+            reduced = (b[huge] / m) ** 2 - ac
+            disc[huge] = reduced * m * m
+            sq[huge] = np.sqrt(np.abs(reduced)) * m
+        # q = -(b + sign(b) * sqrt(D)) / 2 avoids cancellation, the other
+        # root then comes from Vieta: x1 * x2 = c / a.
+        q = -(b / 2 + np.where(b < 0, -sq, sq) / 2)
+        big = q / a
+        small = np.where(q != 0, c / q, 0.0)
+        minus = np.where(b >= 0, big, small)
+        plus = np.where(b >= 0, small, big)
+
+        real_roots = quadratic & (disc > 0)
+        real[real_roots, 0] = minus[real_roots]
+        real[real_roots, 1] = plus[real_roots]
+        res['count'][real_roots] = 2
+
+        double = quadratic & (disc == 0)
+        real[double] = (-b / (2 * a))[double, None]
+        res['count'][double] = 1
+
+        complex_roots = quadratic & (disc < 0)
+        centre = -b / (2 * a)
+        spread = np.abs(sq / (2 * a))
+        real[complex_roots] = centre[complex_roots, None]
+        imag[complex_roots, 0] = -spread[complex_roots]
+        imag[complex_roots, 1] = spread[complex_roots]
+        res['count'][complex_roots] = 2
+    return res.reshape(shape)